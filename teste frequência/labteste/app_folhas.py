@@ -0,0 +1,275 @@
+# Aplicação WSGI para gerar a folha de um professor sob demanda (hospedagem no PythonAnywhere,
+# ver 1_Projeto-PythonAnywhere). A folha sai do mesmo caminho do preencher_pdf, desenhada em
+# memória e devolvida como application/pdf, sem gravar a folha em formularios_preenchidos (só na
+# loja de PDFs, de onde saem as folhas cujas entradas não mudaram).
+# Módulos, modelo PDF, layout e planilhas interpretadas ficam carregados entre as requisições.
+#
+#   GET /folha/<matricula>/<ano>/<mes>.pdf   -> 200 application/pdf | 404 | 500
+#   GET /folhas/<ano>/<mes>.zip              -> 200 application/zip (todas as folhas do mês) | 404
+#   POST /trabalhos/<ano>/<mes>              -> 202 JSON {"id", "status", "resultado"} (fila_folhas.py)
+#   GET /trabalhos/<id>                      -> 200 JSON com estado e andamento | 404
+#   GET /trabalhos/<id>/resultado.zip        -> 200 application/zip | 409 (ainda não concluído) | 404
+#
+# O ZIP é enviado em fluxo (geradorFolhaPonto.fluxo_zip): cada folha é desenhada, comprimida e enviada
+# antes da próxima, então a memória não cresce com o número de professores e o download começa logo.
+# Para lotes que não cabem no tempo de uma requisição, /trabalhos só grava o pedido na fila SQLite;
+# quem gera é o processo 'python fila_folhas.py trabalhar', rodando à parte (tarefa agendada).
+#
+# Configuração (variáveis de ambiente): FOLHAS_DIRETORIO (pasta das planilhas Base-folhaPonto-AAAA-M.xlsx
+# e do modelo; padrão: a pasta deste arquivo), FOLHAS_MODELO (padrão: model2.pdf) e FOLHAS_LOJA (loja de
+# PDFs já desenhados; padrão: formularios_preenchidos/.loja_pdf dentro de FOLHAS_DIRETORIO; vazio desliga).
+#
+# Uso: python app_folhas.py [--porta 8000] [--meses 2025-09..2025-10]   servidor local (wsgiref)
+#      WSGI: from app_folhas import application
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import quote
+from wsgiref.simple_server import make_server
+from wsgiref.util import FileWrapper
+
+import fila_folhas
+import geradorFolhaPonto as gerador
+
+DIRETORIO_DADOS = os.environ.get("FOLHAS_DIRETORIO", os.path.dirname(os.path.abspath(__file__)))
+MODELO = os.path.join(DIRETORIO_DADOS, os.environ.get("FOLHAS_MODELO", "model2.pdf"))
+LOJA = os.environ.get("FOLHAS_LOJA", os.path.join(DIRETORIO_DADOS, "formularios_preenchidos", gerador.PASTA_LOJA_PDF))
+ROTA_FOLHA = re.compile(r"^/folha/(?P<matricula>[^/]+)/(?P<ano>\d{4})/(?P<mes>\d{1,2})\.pdf$")
+ROTA_ZIP = re.compile(r"^/folhas/(?P<ano>\d{4})/(?P<mes>\d{1,2})\.zip$")
+ROTA_ENVIAR_TRABALHO = re.compile(r"^/trabalhos/(?P<ano>\d{4})/(?P<mes>\d{1,2})$")
+ROTA_TRABALHO = re.compile(r"^/trabalhos/(?P<numero>\d+)(?P<resultado>/resultado\.zip)?$")
+
+# PyMuPDF não é thread-safe: servidores WSGI com threads geram uma folha por vez
+_TRAVA_GERACAO = threading.Lock()
+
+if gerador.configurar_loja(LOJA or None) is not None:
+    # Estatísticas da loja: no máximo uma gravação por minuto durante as requisições, e a última na saída
+    atexit.register(gerador.LOJA_PDF.gravar_estatisticas)
+
+
+class FolhaIndisponivel(Exception):
+    """
+    Pedido que não vira PDF; carrega o status HTTP e a mensagem curta devolvida ao cliente.
+    Os detalhes (mensagens do gerador, com caminhos do servidor) vão só para wsgi.errors.
+    """
+    def __init__(self, status, mensagem, detalhes=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.detalhes = detalhes
+
+
+def responder_indisponivel(environ, start_response, erro):
+    if erro.detalhes:
+        environ["wsgi.errors"].write(f"{environ.get('PATH_INFO')}: {erro.detalhes}\n")
+    return responder_texto(start_response, erro.status, str(erro))
+
+
+def gerar_folha(matricula, ano, mes):
+    """(nome do arquivo, bytes do PDF) da folha do professor no mês."""
+    mensagens = io.StringIO()
+    with _TRAVA_GERACAO, contextlib.redirect_stdout(mensagens):
+        carregado = gerador.mes_em_memoria(ano, mes, DIRETORIO_DADOS)
+        if carregado is None:
+            raise FolhaIndisponivel("404 Not Found", "Folha não encontrada.",
+                                    mensagens.getvalue().strip() or f"Mês {mes:02d}/{ano} indisponível.")
+        dados = carregado.professor(matricula)
+        if dados is None:
+            raise FolhaIndisponivel("404 Not Found", "Folha não encontrada.",
+                                    f"Matrícula {matricula} não encontrada em {mes:02d}/{ano}.")
+        # As medições de tempo não acumulam entre requisições
+        gerador.MEDICOES.limpar()
+        conteudo = gerador.pdf_em_memoria(dados, MODELO, carregado.excel_path, carregado.planilha, ano, mes)
+        if gerador.LOJA_PDF is not None:
+            gerador.LOJA_PDF.gravar_estatisticas_periodicamente()
+    if conteudo is None:
+        raise FolhaIndisponivel("500 Internal Server Error", "Erro ao gerar a folha.",
+                                mensagens.getvalue().strip() or f"Falha ao gerar a folha da matrícula {matricula}.")
+    return gerador.nome_arquivo_folha(dados, ano, mes), conteudo
+
+
+def folhas_do_mes(ano, mes, erros):
+    """
+    Gerador de (nome do arquivo, bytes do PDF ou None) para todas as folhas do mês, a entrada do fluxo_zip.
+    A planilha é carregada já na chamada (FolhaIndisponivel antes de a resposta começar); as mensagens
+    das folhas que falharem vão para 'erros' (wsgi.errors).
+    """
+    mensagens = io.StringIO()
+    with _TRAVA_GERACAO, contextlib.redirect_stdout(mensagens):
+        carregado = gerador.mes_em_memoria(ano, mes, DIRETORIO_DADOS)
+    if carregado is None:
+        raise FolhaIndisponivel("404 Not Found", "Folhas não encontradas.",
+                                mensagens.getvalue().strip() or f"Mês {mes:02d}/{ano} indisponível.")
+    if not carregado.dicionario_dados:
+        raise FolhaIndisponivel("404 Not Found", "Folhas não encontradas.", f"Nenhum professor em {mes:02d}/{ano}.")
+
+    def folhas():
+        for _, nome, conteudo, mensagens_folha in gerador.folhas_em_bytes(
+                carregado.dicionario_dados, MODELO, carregado.excel_path, carregado.planilha, ano, mes,
+                trava=_TRAVA_GERACAO):
+            if conteudo is None:
+                erros.write(f"Falha na folha {nome} do ZIP de {mes:02d}/{ano}:\n{mensagens_folha}")
+            yield nome, conteudo
+        if gerador.LOJA_PDF is not None:
+            with _TRAVA_GERACAO:
+                gerador.LOJA_PDF.gravar_estatisticas_periodicamente()
+    return folhas()
+
+
+def responder_texto(start_response, status, texto, cabecalhos=()):
+    corpo = (texto + "\n").encode("utf-8")
+    start_response(status, [("Content-Type", "text/plain; charset=utf-8"),
+                            ("Content-Length", str(len(corpo)))] + list(cabecalhos))
+    return [corpo]
+
+
+def responder_zip(environ, start_response, ano, mes, metodo):
+    try:
+        folhas = folhas_do_mes(ano, mes, environ["wsgi.errors"])
+    except FolhaIndisponivel as e:
+        return responder_indisponivel(environ, start_response, e)
+    # Sem Content-Length: o tamanho só é conhecido quando a última folha for comprimida
+    start_response("200 OK", [
+        ("Content-Type", "application/zip"),
+        ("Content-Disposition", f"attachment; filename=Folhas_frequencia_{ano}-{mes}.zip"),
+        ("Cache-Control", "no-store"),
+    ])
+    if metodo == "HEAD":
+        folhas.close()
+        return []
+    return gerador.fluxo_zip(folhas)
+
+
+def responder_json(start_response, status, dados, cabecalhos=()):
+    corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+    start_response(status, [("Content-Type", "application/json; charset=utf-8"),
+                            ("Content-Length", str(len(corpo))), ("Cache-Control", "no-store")] + list(cabecalhos))
+    return [corpo]
+
+
+def responder_trabalhos(environ, start_response, caminho, metodo):
+    """Rotas da fila de trabalhos; None se o caminho não é de /trabalhos."""
+    enviar = ROTA_ENVIAR_TRABALHO.match(caminho)
+    consulta = ROTA_TRABALHO.match(caminho)
+    if enviar is None and consulta is None:
+        return None
+    if enviar is not None:
+        if metodo != "POST":
+            return responder_texto(start_response, "405 Method Not Allowed", "Somente POST.", [("Allow", "POST")])
+        ano, mes = int(enviar.group("ano")), int(enviar.group("mes"))
+        if not 1 <= mes <= 12:
+            return responder_texto(start_response, "404 Not Found", f"Mês inválido: {mes}.")
+        if not os.path.exists(os.path.join(DIRETORIO_DADOS, f"Base-folhaPonto-{ano}-{mes}.xlsx")):
+            return responder_texto(start_response, "404 Not Found", "Folhas não encontradas.")
+        with contextlib.closing(fila_folhas.conectar(DIRETORIO_DADOS)) as conexao:
+            numero = fila_folhas.enviar_trabalho(conexao, ano, mes, os.path.basename(MODELO))
+        return responder_json(start_response, "202 Accepted",
+                              {"id": numero, "status": f"/trabalhos/{numero}",
+                               "resultado": f"/trabalhos/{numero}/resultado.zip"},
+                              [("Location", f"/trabalhos/{numero}")])
+
+    if metodo not in ("GET", "HEAD"):
+        return responder_texto(start_response, "405 Method Not Allowed", "Somente GET.", [("Allow", "GET, HEAD")])
+    numero = int(consulta.group("numero"))
+    with contextlib.closing(fila_folhas.conectar(DIRETORIO_DADOS)) as conexao:
+        try:
+            status = fila_folhas.status_trabalho(conexao, numero)
+            resultado = fila_folhas.resultado_trabalho(conexao, numero)
+        except fila_folhas.TrabalhoInexistente as e:
+            return responder_texto(start_response, "404 Not Found", str(e))
+    if not consulta.group("resultado"):
+        # O caminho do ZIP no servidor não interessa ao cliente: vai a URL de download
+        status["resultado"] = f"/trabalhos/{numero}/resultado.zip" if resultado else None
+        return responder_json(start_response, "200 OK", status)
+    if resultado is None:
+        return responder_texto(start_response, "409 Conflict", f"Trabalho {numero} ainda sem resultado ({status['estado']}).")
+
+    start_response("200 OK", [
+        ("Content-Type", "application/zip"),
+        ("Content-Length", str(os.path.getsize(resultado))),
+        ("Content-Disposition", f"attachment; filename={os.path.basename(resultado)}"),
+    ])
+    if metodo == "HEAD":
+        return []
+    arquivo = open(resultado, "rb")
+    return environ.get("wsgi.file_wrapper", FileWrapper)(arquivo, 64 * 1024)
+
+
+def application(environ, start_response):
+    caminho = environ.get("PATH_INFO", "")
+    resposta = responder_trabalhos(environ, start_response, caminho, environ.get("REQUEST_METHOD", "GET"))
+    if resposta is not None:
+        return resposta
+    rota = ROTA_FOLHA.match(caminho) or ROTA_ZIP.match(caminho)
+    if rota is None:
+        return responder_texto(start_response, "404 Not Found",
+                               "Use GET /folha/<matricula>/<ano>/<mes>.pdf, GET /folhas/<ano>/<mes>.zip "
+                               "ou POST /trabalhos/<ano>/<mes>")
+    metodo = environ.get("REQUEST_METHOD", "GET")
+    if metodo not in ("GET", "HEAD"):
+        return responder_texto(start_response, "405 Method Not Allowed", "Somente GET.", [("Allow", "GET, HEAD")])
+    ano, mes = int(rota.group("ano")), int(rota.group("mes"))
+    if not 1 <= mes <= 12:
+        return responder_texto(start_response, "404 Not Found", f"Mês inválido: {mes}.")
+    if rota.re is ROTA_ZIP:
+        return responder_zip(environ, start_response, ano, mes, metodo)
+
+    inicio = time.perf_counter()
+    try:
+        nome_arquivo, conteudo = gerar_folha(rota.group("matricula"), ano, mes)
+    except FolhaIndisponivel as e:
+        return responder_indisponivel(environ, start_response, e)
+    except Exception as e:
+        environ["wsgi.errors"].write(f"Erro ao gerar a folha ({environ.get('PATH_INFO')}): {e}\n")
+        return responder_texto(start_response, "500 Internal Server Error", "Erro ao gerar a folha.")
+
+    start_response("200 OK", [
+        ("Content-Type", "application/pdf"),
+        ("Content-Length", str(len(conteudo))),
+        ("Content-Disposition", f"inline; filename*=UTF-8''{quote(nome_arquivo)}"),
+        ("Cache-Control", "no-store"),  # a planilha pode mudar a qualquer momento
+        ("Server-Timing", f"geracao;dur={(time.perf_counter() - inicio) * 1000:.1f}"),
+    ])
+    return [] if metodo == "HEAD" else [conteudo]
+
+
+def aquecer(meses):
+    """Carrega as planilhas dos meses e desenha uma folha de cada (fontes, camada do mês) antes da primeira requisição."""
+    for ano, mes in meses:
+        with contextlib.redirect_stdout(io.StringIO()):
+            carregado = gerador.mes_em_memoria(ano, mes, DIRETORIO_DADOS)
+        if carregado is None or not carregado.dicionario_dados:
+            print(f"Mês {mes:02d}/{ano} não carregado.")
+            continue
+        try:
+            gerar_folha(carregado.dicionario_dados[0].get("Matricula"), ano, mes)
+        except FolhaIndisponivel as e:
+            print(f"Mês {mes:02d}/{ano}: {e}")
+        print(f"Mês {mes:02d}/{ano} carregado: {len(carregado.professores)} professor(es).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor WSGI local das folhas de frequência.")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--meses", type=gerador.intervalo_meses, default=None, metavar="AAAA-MM..AAAA-MM",
+                        help="meses carregados já na partida (padrão: o mês de referência do gerador)")
+    args = parser.parse_args()
+
+    aquecer(args.meses or [gerador.mes_referencia()])
+    with make_server("127.0.0.1", args.porta, application) as servidor:
+        print(f"Atendendo em http://127.0.0.1:{args.porta}/folha/<matricula>/<ano>/<mes>.pdf "
+              f"e http://127.0.0.1:{args.porta}/folhas/<ano>/<mes>.zip")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Micro-benchmark: desenho do quadro de frequência chamada a chamada (page.draw_rect/insert_text)
+# contra o desenho em lote (PincelLote, um único Shape.commit por página)
+#
+# Uso: python benchmark_desenho.py [repeticoes]
+
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+import geradorFolhaPonto as gerador
+
+MODELO = "model2.pdf"
+DIAS_NO_MES = 31
+MASCARA_DIA = 0b1111 | (0b1111 << 8)  # aulas 1-4 da manhã e 3-6 da tarde
+
+
+def desenhar_quadro(page):
+    """Desenha ~100 operações, como numa folha de 31 dias: tarjas, textos e retângulos de aula."""
+    layout = gerador.layout_do_modelo(MODELO)
+    _, posicoes_y = layout.plano_paginas(DIAS_NO_MES, page.rect.height)[0]
+    for idx, y_freq in enumerate(posicoes_y):
+        page.insert_text((layout.x_dias, y_freq), f"{idx + 1:02d}  Seg", fontsize=layout.fonte_dias)
+        if idx % 7 == 6:
+            gerador.destacar_domingo(page, layout, y_freq)
+            continue
+        gerador.desenhar_turno(page, layout, y_freq, MASCARA_DIA, 'manha')
+        gerador.desenhar_turno(page, layout, y_freq, MASCARA_DIA, 'tarde')
+
+
+def por_chamada():
+    doc = fitz.open(MODELO)
+    desenhar_quadro(doc[0])
+    return doc
+
+
+def em_lote():
+    doc = fitz.open(MODELO)
+    pincel = gerador.PincelLote(doc[0])
+    desenhar_quadro(pincel)
+    pincel.commit()
+    return doc
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        doc = funcao()
+        tamanho = len(doc.tobytes())
+        doc.close()
+    return (time.perf_counter() - inicio) / repeticoes, tamanho
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"=== Benchmark de desenho ({repeticoes} folhas por caminho) ===")
+    resultados = {}
+    for nome, funcao in (("por chamada", por_chamada), ("em lote", em_lote)):
+        segundos, tamanho = medir(funcao, repeticoes)
+        resultados[nome] = segundos
+        print(f"{nome:12s}: {segundos * 1000:8.1f} ms/folha | PDF {tamanho / 1024:.0f} KB")
+    print(f"Ganho: {resultados['por chamada'] / resultados['em lote']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
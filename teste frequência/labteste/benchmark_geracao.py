@@ -0,0 +1,154 @@
+# Benchmark da geração completa: para cada tamanho (padrão 10, 100 e 1000 professores) gera uma
+# planilha sintética (gerar_planilha_sintetica.py) num diretório temporário e mede o
+# processamento_central() num processo à parte: tempo, folhas/s, pico de memória (RSS) e
+# tamanho dos PDFs. Cada execução é acrescentada a resultados_benchmark.jsonl e comparada
+# com a execução anterior do mesmo tamanho.
+#
+# Uso: python benchmark_geracao.py [tamanhos ...] [--jobs N] [--semente S] [--resultados arquivo.jsonl]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource  # só existe em sistemas Unix
+except ImportError:
+    resource = None
+
+import gerar_planilha_sintetica
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+MODELO = "model2.pdf"
+ANO, MES = 2025, 10
+TAMANHOS = (10, 100, 1000)
+ARQUIVO_RESULTADOS = os.path.join(DIRETORIO, "resultados_benchmark.jsonl")
+
+
+def pico_rss_mb():
+    """Pico de memória residente deste processo ou do maior processo do pool (--jobs), em MB (None fora do Unix)."""
+    if resource is None:
+        return None
+    pico = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def executar_filho(jobs):
+    """Roda no diretório da planilha sintética: gera as folhas e imprime as medições em JSON."""
+    sys.path.insert(0, DIRETORIO)
+    import geradorFolhaPonto as gerador
+
+    inicio = time.perf_counter()
+    cpu = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gerador.processamento_central(forcar=True, jobs=jobs, ano=ANO, mes=MES)
+    segundos = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu
+
+    pasta = "formularios_preenchidos"
+    pdfs = [os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.endswith(".pdf")]
+    print(json.dumps({
+        "segundos": round(segundos, 3),
+        "cpu_s": round(cpu, 3),
+        "folhas": len(pdfs),
+        "bytes_saida": sum(os.path.getsize(pdf) for pdf in pdfs),
+        "pico_rss_mb": pico_rss_mb(),
+    }))
+
+
+def medir(professores, jobs, semente):
+    """Gera a planilha e mede a geração das folhas num processo novo (memória e caches zerados)."""
+    diretorio = tempfile.mkdtemp(prefix=f"benchmark_folhas_{professores}_")
+    try:
+        inicio = time.perf_counter()
+        gerar_planilha_sintetica.gerar_planilha(os.path.join(diretorio, f"Base-folhaPonto-{ANO}-{MES}.xlsx"),
+                                                professores, ANO, MES, semente)
+        segundos_planilha = time.perf_counter() - inicio
+        shutil.copy(os.path.join(DIRETORIO, MODELO), diretorio)
+
+        processo = subprocess.run([sys.executable, os.path.abspath(__file__), "--filho", "--jobs", str(jobs)],
+                                  cwd=diretorio, capture_output=True, text=True)
+        if processo.returncode != 0:
+            print(processo.stderr)
+            raise RuntimeError(f"benchmark com {professores} professor(es) falhou")
+        medicao = json.loads(processo.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    medicao.update(professores=professores, jobs=jobs, segundos_planilha=round(segundos_planilha, 3),
+                   folhas_por_segundo=round(medicao["folhas"] / medicao["segundos"], 2) if medicao["segundos"] else None)
+    return medicao
+
+
+def versao_do_codigo():
+    """Commit atual (se for um repositório git) e versão de renderização do gerador."""
+    sys.path.insert(0, DIRETORIO)
+    import geradorFolhaPonto as gerador
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "versao_renderizacao": gerador.VERSAO_RENDERIZACAO}
+
+
+def ultimos_resultados(caminho):
+    """Última medição gravada para cada (professores, jobs)."""
+    ultimos = {}
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    execucao = json.loads(linha)
+                    for medicao in execucao["medicoes"]:
+                        ultimos[(medicao["professores"], medicao["jobs"])] = (execucao, medicao)
+    return ultimos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração das folhas de frequência.")
+    parser.add_argument("tamanhos", type=int, nargs="*", default=TAMANHOS,
+                        help="números de professores a medir (padrão: 10 100 1000)")
+    parser.add_argument("--jobs", type=int, default=1, help="repassado ao processamento_central (padrão: 1)")
+    parser.add_argument("--semente", type=int, default=1, help="semente das planilhas sintéticas (padrão: 1)")
+    parser.add_argument("--resultados", default=ARQUIVO_RESULTADOS, help="arquivo JSONL com o histórico")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        executar_filho(args.jobs)
+        return
+
+    anteriores = ultimos_resultados(args.resultados)
+    execucao = dict(data=datetime.now().isoformat(timespec="seconds"), **versao_do_codigo(), medicoes=[])
+    print(f"=== Benchmark da geração (commit {execucao['commit']}, jobs={args.jobs}) ===")
+    print(f"{'Professores':>11s} {'Tempo (s)':>10s} {'Folhas/s':>9s} {'Pico RSS':>10s} {'Saída':>10s}  Anterior")
+    for professores in args.tamanhos:
+        medicao = medir(professores, args.jobs, args.semente)
+        execucao["medicoes"].append(medicao)
+
+        comparacao = "-"
+        if (professores, args.jobs) in anteriores:
+            exec_anterior, anterior = anteriores[(professores, args.jobs)]
+            comparacao = (f"{anterior['folhas_por_segundo']} folhas/s em {exec_anterior['commit']} "
+                          f"({medicao['folhas_por_segundo'] / anterior['folhas_por_segundo']:.2f}x)")
+        rss = f"{medicao['pico_rss_mb']} MB" if medicao["pico_rss_mb"] is not None else "-"
+        print(f"{professores:11d} {medicao['segundos']:10.2f} {medicao['folhas_por_segundo']:9.1f} "
+              f"{rss:>10s} {medicao['bytes_saida'] / (1024 * 1024):7.1f} MB  {comparacao}")
+
+    with open(args.resultados, "a", encoding="utf-8") as f:
+        f.write(json.dumps(execucao, ensure_ascii=False) + "\n")
+    print(f"Resultados acrescentados a: {args.resultados}")
+
+
+if __name__ == "__main__":
+    main()
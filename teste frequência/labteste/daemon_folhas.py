@@ -0,0 +1,256 @@
+# Servidor local que mantém o gerador "quente" para reimpressões de uma folha: pandas, openpyxl,
+# babel e PyMuPDF já importados, dados de locale carregados, modelo PDF e layout em memória e as
+# planilhas Base-folhaPonto-AAAA-M.xlsx já interpretadas (relidas só quando o arquivo muda).
+# Recebe pedidos por um socket Unix, uma linha JSON por conexão, e responde com o caminho do PDF.
+#
+# O cliente (comando 'pedir') usa só a biblioteca padrão, então não paga a importação do gerador.
+# Folhas cujas entradas não mudaram saem da loja de PDFs do gerador (formularios_preenchidos/.loja_pdf).
+#
+# Uso: python daemon_folhas.py servir [--meses 2025-09..2025-10] [--modelo model2.pdf] [--sem-loja] [--socket CAMINHO]
+#      python daemon_folhas.py pedir MATRICULA [--mes 2025-10] [--socket CAMINHO]
+#      python daemon_folhas.py status | parar [--socket CAMINHO]
+#
+# Protocolo: {"comando": "gerar", "matricula": "1000001", "ano": 2025, "mes": 10}
+#         -> {"ok": true, "pdf": "/.../formularios_preenchidos/Nome_2025-10.pdf", "ms": 41.7}
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+SOCKET_PADRAO = os.path.join(tempfile.gettempdir(), f"folhas_ponto_{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+PASTA_SAIDA = "formularios_preenchidos"
+TIMEOUT_CLIENTE = 120  # segundos; o primeiro pedido de um mês ainda não carregado lê a planilha
+
+
+class PedidoInvalido(Exception):
+    """Erro do pedido (mês sem planilha, matrícula inexistente...), devolvido ao cliente sem derrubar o servidor."""
+
+
+# === INÍCIO SERVIDOR ===
+class TratadorPedido(socketserver.StreamRequestHandler):
+    def handle(self):
+        linha = self.rfile.readline()
+        if not linha.strip():
+            return  # conexão sem pedido (ex.: teste de servidor ativo em socket_em_uso)
+        try:
+            pedido = json.loads(linha)
+            resposta = self.server.atender(pedido)
+        except PedidoInvalido as e:
+            resposta = {'ok': False, 'erro': str(e)}
+        except Exception as e:
+            resposta = {'ok': False, 'erro': f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(resposta, ensure_ascii=False) + "\n").encode('utf-8'))
+
+
+class ServidorFolhas(socketserver.UnixStreamServer):
+    """
+    Atende um pedido por vez (PyMuPDF não é thread-safe); cada pedido leva milissegundos
+    com tudo carregado. Os meses ficam em memória até a planilha ser alterada em disco.
+    """
+    def __init__(self, caminho_socket, gerador, modelo):
+        super().__init__(caminho_socket, TratadorPedido)
+        self.gerador = gerador
+        self.modelo = modelo
+        self.meses = set()
+        self.iniciado_em = time.time()
+        self.pedidos = 0
+
+    def mes(self, ano, mes):
+        """Planilha do mês já interpretada (gerador.mes_em_memoria), relida só se o xlsx mudou."""
+        mensagens = io.StringIO()
+        with contextlib.redirect_stdout(mensagens):
+            carregado = self.gerador.mes_em_memoria(ano, mes)
+        if carregado is None:
+            raise PedidoInvalido(mensagens.getvalue().strip() or f"Planilha de {mes:02d}/{ano} inválida.")
+        self.meses.add((ano, mes))
+        return carregado
+
+    def aquecer(self, meses):
+        """Carrega os meses e desenha uma folha de cada um em memória (fontes, camada do mês)."""
+        self.gerador.bytes_modelo(self.modelo)
+        layout = self.gerador.layout_do_modelo(self.modelo)
+        for ano, mes in meses:
+            try:
+                carregado = self.mes(ano, mes)
+            except PedidoInvalido as e:
+                print(f"Mês {mes:02d}/{ano} não carregado: {e}")
+                continue
+            for dados in list(carregado.professores.values())[:1]:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    lidos = self.gerador.ler_dados_professor(dados, carregado.excel_path, carregado.planilha, ano, mes)
+                    if lidos is not None:
+                        with self.gerador.abrir_modelo(self.modelo) as doc:
+                            self.gerador.desenhar_folha(doc, 0, *lidos, ano=ano, mes=mes, layout=layout)
+            print(f"Mês {mes:02d}/{ano} carregado: {len(carregado.professores)} professor(es).")
+
+    def atender(self, pedido):
+        comando = pedido.get('comando', 'gerar')
+        if comando == 'status':
+            loja = self.gerador.LOJA_PDF
+            return {'ok': True, 'pid': os.getpid(), 'modelo': self.modelo, 'pedidos': self.pedidos,
+                    'ativo_ha_s': round(time.time() - self.iniciado_em, 1),
+                    'meses': [f"{ano}-{mes:02d}" for ano, mes in sorted(self.meses)],
+                    'loja': dict(loja.ler_estatisticas(), ainda_nao_gravados=loja.contadores) if loja is not None else None}
+        if comando == 'parar':
+            # shutdown() espera o laço do servidor terminar: não pode rodar na thread que atende o pedido
+            threading.Thread(target=self.shutdown).start()
+            return {'ok': True}
+        if comando != 'gerar':
+            raise PedidoInvalido(f"Comando desconhecido: {comando}")
+        return self.gerar(pedido)
+
+    def gerar(self, pedido):
+        inicio = time.perf_counter()
+        ano, mes = self.gerador.mes_referencia(pedido.get('ano'), pedido.get('mes'))
+        carregado = self.mes(int(ano), int(mes))
+        dados = carregado.professor(pedido.get('matricula'))
+        if dados is None:
+            raise PedidoInvalido(f"Matrícula {pedido.get('matricula')} não encontrada em {carregado.excel_path}.")
+
+        os.makedirs(PASTA_SAIDA, exist_ok=True)
+        saida_pdf = os.path.abspath(os.path.join(PASTA_SAIDA, self.gerador.nome_arquivo_folha(dados, ano, mes)))
+        # As medições de tempo não acumulam entre pedidos
+        self.gerador.MEDICOES.limpar()
+        mensagens = io.StringIO()
+        with contextlib.redirect_stdout(mensagens):
+            sucesso = self.gerador.preencher_pdf(dados, self.modelo, saida_pdf, carregado.excel_path,
+                                                 carregado.planilha, ano, mes)
+            if self.gerador.LOJA_PDF is not None:
+                self.gerador.LOJA_PDF.gravar_estatisticas_periodicamente()
+        self.pedidos += 1
+        if not sucesso:
+            raise PedidoInvalido(mensagens.getvalue().strip() or f"Falha ao gerar a folha de {dados['NomeProf']}.")
+        return {'ok': True, 'pdf': saida_pdf, 'ms': round((time.perf_counter() - inicio) * 1000, 1)}
+
+
+def socket_em_uso(caminho_socket):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as cliente:
+        try:
+            cliente.connect(caminho_socket)
+            return True
+        except OSError:
+            return False
+
+
+def servir(args):
+    if os.path.exists(args.socket):
+        if socket_em_uso(args.socket):
+            print(f"Já existe um servidor atendendo em {args.socket}.")
+            return 1
+        os.remove(args.socket)  # sobra de um servidor que não terminou direito
+
+    inicio = time.perf_counter()
+    import geradorFolhaPonto as gerador  # pandas, openpyxl, babel e PyMuPDF: pagos uma única vez
+    gerador.format_date(gerador.datetime(2000, 1, 1), "MMMM", locale="pt_BR")  # dados de locale do babel
+    print(f"Gerador importado em {time.perf_counter() - inicio:.2f}s.")
+    try:
+        meses = gerador.intervalo_meses(args.meses) if args.meses else [gerador.mes_referencia()]
+    except argparse.ArgumentTypeError as e:
+        print(f"Erro: {e}")
+        return 2
+    if not args.sem_loja:
+        gerador.configurar_loja(os.path.join(PASTA_SAIDA, gerador.PASTA_LOJA_PDF))
+
+    servidor = ServidorFolhas(args.socket, gerador, args.modelo)
+    try:
+        servidor.aquecer(meses)
+        print(f"Pronto em {time.perf_counter() - inicio:.2f}s; atendendo em {args.socket} (pid {os.getpid()}).")
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if gerador.LOJA_PDF is not None:
+            gerador.LOJA_PDF.gravar_estatisticas()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+    print("Servidor encerrado.")
+    return 0
+# === FIM SERVIDOR ===
+
+
+# === INÍCIO CLIENTE ===
+def enviar(caminho_socket, pedido):
+    """Envia um pedido ao servidor e devolve a resposta (dicionário)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as cliente:
+        cliente.settimeout(TIMEOUT_CLIENTE)
+        cliente.connect(caminho_socket)
+        cliente.sendall((json.dumps(pedido, ensure_ascii=False) + "\n").encode('utf-8'))
+        with cliente.makefile('rb') as resposta:
+            return json.loads(resposta.readline())
+
+
+def ano_mes(texto):
+    try:
+        ano, mes = (int(p) for p in texto.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mês inválido: '{texto}' (use AAAA-MM)")
+    if not 1 <= mes <= 12:
+        raise argparse.ArgumentTypeError(f"mês inválido: '{texto}'")
+    return ano, mes
+
+
+def pedir(args):
+    pedido = {'comando': args.comando}
+    if args.comando == 'pedir':
+        pedido = {'comando': 'gerar', 'matricula': args.matricula}
+        if args.mes:
+            pedido['ano'], pedido['mes'] = args.mes
+    try:
+        resposta = enviar(args.socket, pedido)
+    except OSError as e:
+        print(f"Servidor indisponível em {args.socket} ({e}); inicie com: python daemon_folhas.py servir")
+        return 2
+    if not resposta.get('ok'):
+        print(f"Erro: {resposta.get('erro')}")
+        return 1
+    if args.comando == 'pedir':
+        print(resposta['pdf'])
+        print(f"({resposta['ms']} ms no servidor)", file=sys.stderr)
+    elif args.comando == 'status':
+        print(json.dumps(resposta, ensure_ascii=False, indent=1))
+    return 0
+# === FIM CLIENTE ===
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local (socket Unix) para gerar folhas sob demanda.")
+    parser.add_argument("--socket", default=SOCKET_PADRAO, help=f"caminho do socket (padrão: {SOCKET_PADRAO})")
+    # --socket também é aceito depois do subcomando (SUPPRESS: sem ele, vale o valor de antes do subcomando)
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--socket", default=argparse.SUPPRESS, help=f"caminho do socket (padrão: {SOCKET_PADRAO})")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_servir = comandos.add_parser("servir", parents=[comum], help="inicia o servidor (fica em primeiro plano)")
+    p_servir.add_argument("--meses", default=None, metavar="AAAA-MM..AAAA-MM",
+                          help="meses carregados já na partida (padrão: o mês de referência do gerador)")
+    p_servir.add_argument("--modelo", default="model2.pdf", metavar="ARQUIVO", help="PDF modelo (padrão: model2.pdf)")
+    p_servir.add_argument("--sem-loja", action="store_true", help="desenha todas as folhas sem consultar a loja de PDFs")
+
+    p_pedir = comandos.add_parser("pedir", parents=[comum], help="gera a folha de um professor e imprime o caminho do PDF")
+    p_pedir.add_argument("matricula")
+    p_pedir.add_argument("--mes", type=ano_mes, default=None, metavar="AAAA-MM",
+                         help="mês da folha (padrão: o mês de referência do servidor)")
+
+    comandos.add_parser("status", parents=[comum], help="mostra os meses carregados e o número de pedidos atendidos")
+    comandos.add_parser("parar", parents=[comum], help="encerra o servidor")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Este sistema não tem sockets Unix; use geradorFolhaPonto.py diretamente.")
+        return 1
+    if args.comando == "servir":
+        return servir(args)
+    return pedir(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
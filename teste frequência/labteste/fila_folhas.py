@@ -0,0 +1,364 @@
+# Fila de trabalhos em segundo plano para gerar as folhas de um mês inteiro fora da requisição
+# (hospedagem compartilhada: o lote completo não cabe no tempo de uma requisição web).
+# Os pedidos ficam numa tabela SQLite; um processo trabalhador pega o trabalho mais antigo, gera as
+# folhas em lotes de professores (mesmo caminho do processamento_central: gerar_folhas, loja de PDFs)
+# e registra o andamento professor a professor. No fim, junta as folhas num ZIP (o resultado).
+#
+# Um trabalhador que morre no meio (reinício do servidor, processo encerrado) deixa o trabalho em
+# 'executando'; o próximo trabalhador o retoma quando o anterior não está mais vivo (ou parou de dar
+# sinal há PRAZO_SINAL segundos), pulando os professores já concluídos cujo PDF ainda existe.
+#
+# Uso: python fila_folhas.py enviar [--mes 2025-10] [--modelo model2.pdf]   imprime o número do trabalho
+#      python fila_folhas.py status [NUMERO] [--professores]                  um trabalho ou os últimos
+#      python fila_folhas.py resultado NUMERO [--copiar DESTINO.zip]          caminho do ZIP
+#      python fila_folhas.py trabalhar [--uma-vez] [--jobs N] [--sem-loja]   processo trabalhador
+#
+# Configuração: --diretorio (ou FOLHAS_DIRETORIO) é a pasta das planilhas e do modelo; o banco fica em
+# formularios_preenchidos/fila_trabalhos.sqlite3 e as folhas de cada trabalho em
+# formularios_preenchidos/trabalhos/<numero>/. A aplicação WSGI (app_folhas.py) usa as mesmas funções.
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from daemon_folhas import ano_mes
+
+DIRETORIO_PADRAO = os.environ.get("FOLHAS_DIRETORIO", os.path.dirname(os.path.abspath(__file__)))
+PASTA_SAIDA = "formularios_preenchidos"
+ARQUIVO_BANCO = "fila_trabalhos.sqlite3"
+PASTA_TRABALHOS = "trabalhos"
+TAMANHO_LOTE = 20        # professores por lote (andamento gravado a cada professor)
+PRAZO_SINAL = 300        # segundos sem sinal do trabalhador até o trabalho ser retomado por outro
+INTERVALO_CONSULTA = 2   # segundos entre consultas à fila quando não há trabalho
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabalhos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ano INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    modelo TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendente',   -- pendente | executando | concluido | falhou
+    criado_em TEXT NOT NULL,
+    iniciado_em TEXT,
+    concluido_em TEXT,
+    trabalhador TEXT,                          -- host:pid de quem está executando
+    sinal REAL,                                -- time.time() do último sinal do trabalhador
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    resultado TEXT,                            -- caminho do ZIP
+    erro TEXT
+);
+CREATE TABLE IF NOT EXISTS professores (
+    trabalho INTEGER NOT NULL REFERENCES trabalhos(id),
+    indice INTEGER NOT NULL,
+    matricula TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendente',   -- pendente | concluido | falhou
+    saida TEXT,
+    mensagens TEXT,
+    concluido_em TEXT,
+    PRIMARY KEY (trabalho, indice)
+);
+CREATE INDEX IF NOT EXISTS trabalhos_estado ON trabalhos(estado, id);
+"""
+
+
+class TrabalhoInexistente(Exception):
+    """Número de trabalho que não está na fila."""
+
+
+def agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def caminho_banco(diretorio):
+    return os.path.join(diretorio, PASTA_SAIDA, ARQUIVO_BANCO)
+
+
+def conectar(diretorio):
+    """Conexão em autocommit (transações explícitas) com WAL, para consultar o status enquanto o trabalhador grava."""
+    os.makedirs(os.path.join(diretorio, PASTA_SAIDA), exist_ok=True)
+    conexao = sqlite3.connect(caminho_banco(diretorio), timeout=30, isolation_level=None)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+# === INÍCIO PEDIDOS ===
+def enviar_trabalho(conexao, ano, mes, modelo="model2.pdf"):
+    """Coloca a geração do mês na fila e devolve o número do trabalho."""
+    cursor = conexao.execute("INSERT INTO trabalhos (ano, mes, modelo, criado_em) VALUES (?, ?, ?, ?)",
+                             (ano, mes, modelo, agora()))
+    return cursor.lastrowid
+
+
+def status_trabalho(conexao, numero, professores=False):
+    """Dicionário com o estado, o andamento (concluídos/falhas/total) e, opcionalmente, cada professor."""
+    trabalho = conexao.execute("SELECT * FROM trabalhos WHERE id = ?", (numero,)).fetchone()
+    if trabalho is None:
+        raise TrabalhoInexistente(f"Trabalho {numero} não encontrado.")
+    contagem = dict(conexao.execute("SELECT estado, COUNT(*) FROM professores WHERE trabalho = ? GROUP BY estado",
+                                    (numero,)).fetchall())
+    status = {k: trabalho[k] for k in trabalho.keys() if k != "sinal"}
+    status['andamento'] = {'total': sum(contagem.values()), 'concluidos': contagem.get('concluido', 0),
+                           'falhas': contagem.get('falhou', 0), 'pendentes': contagem.get('pendente', 0)}
+    if professores:
+        status['professores'] = [dict(linha) for linha in conexao.execute(
+            "SELECT indice, matricula, nome, estado, saida, mensagens, concluido_em FROM professores "
+            "WHERE trabalho = ? ORDER BY indice", (numero,))]
+    return status
+
+
+def listar_trabalhos(conexao, limite=20):
+    return [status_trabalho(conexao, linha['id']) for linha in
+            conexao.execute("SELECT id FROM trabalhos ORDER BY id DESC LIMIT ?", (limite,))]
+
+
+def resultado_trabalho(conexao, numero):
+    """Caminho do ZIP de um trabalho concluído; None se ainda não terminou (ou falhou)."""
+    status = status_trabalho(conexao, numero)
+    if status['estado'] != 'concluido' or not status['resultado'] or not os.path.exists(status['resultado']):
+        return None
+    return status['resultado']
+# === FIM PEDIDOS ===
+
+
+# === INÍCIO TRABALHADOR ===
+def identificacao_trabalhador():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def trabalhador_vivo(identificacao):
+    """Falso só quando dá para ter certeza: mesmo host e processo inexistente."""
+    host, _, pid = (identificacao or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def pegar_trabalho(conexao):
+    """
+    Marca como 'executando' o trabalho pendente mais antigo, ou um 'executando' abandonado
+    (trabalhador morto ou sem sinal há PRAZO_SINAL segundos). Devolve a linha do trabalho ou None.
+    """
+    eu = identificacao_trabalhador()
+    conexao.execute("BEGIN IMMEDIATE")
+    try:
+        escolhido = None
+        for trabalho in conexao.execute("SELECT * FROM trabalhos WHERE estado IN ('pendente', 'executando') ORDER BY id"):
+            if trabalho['estado'] == 'pendente' or not trabalhador_vivo(trabalho['trabalhador']) \
+                    or time.time() - (trabalho['sinal'] or 0) > PRAZO_SINAL:
+                escolhido = trabalho
+                break
+        if escolhido is not None:
+            conexao.execute("UPDATE trabalhos SET estado = 'executando', trabalhador = ?, sinal = ?, "
+                            "tentativas = tentativas + 1, iniciado_em = COALESCE(iniciado_em, ?) WHERE id = ?",
+                            (eu, time.time(), agora(), escolhido['id']))
+        conexao.execute("COMMIT")
+    except BaseException:
+        conexao.execute("ROLLBACK")
+        raise
+    if escolhido is None:
+        return None
+    if escolhido['estado'] == 'executando':
+        print(f"Retomando o trabalho {escolhido['id']} (trabalhador anterior: {escolhido['trabalhador']}).")
+    return conexao.execute("SELECT * FROM trabalhos WHERE id = ?", (escolhido['id'],)).fetchone()
+
+
+def dar_sinal(conexao, numero):
+    conexao.execute("UPDATE trabalhos SET sinal = ? WHERE id = ?", (time.time(), numero))
+
+
+def encerrar_trabalho(conexao, numero, estado, resultado=None, erro=None):
+    conexao.execute("UPDATE trabalhos SET estado = ?, resultado = ?, erro = ?, concluido_em = ?, sinal = NULL "
+                    "WHERE id = ?", (estado, resultado, erro, agora(), numero))
+
+
+def executar_trabalho(conexao, trabalho, gerador, diretorio, jobs=1):
+    """Gera as folhas pendentes do trabalho em lotes, gravando o andamento de cada professor, e monta o ZIP."""
+    numero, ano, mes = trabalho['id'], trabalho['ano'], trabalho['mes']
+    modelo = os.path.join(diretorio, trabalho['modelo'])
+    pasta = os.path.join(diretorio, PASTA_SAIDA, PASTA_TRABALHOS, str(numero))
+    os.makedirs(pasta, exist_ok=True)
+    gerador.MEDICOES.limpar()
+
+    carregado = gerador.mes_em_memoria(ano, mes, diretorio)
+    if carregado is None:
+        encerrar_trabalho(conexao, numero, 'falhou', erro=f"Planilha de {mes:02d}/{ano} indisponível.")
+        return
+    if not os.path.exists(modelo):
+        encerrar_trabalho(conexao, numero, 'falhou', erro=f"Modelo {trabalho['modelo']} não encontrado.")
+        return
+
+    # Na primeira execução, a lista de professores do mês vira a lista de itens do trabalho
+    if conexao.execute("SELECT COUNT(*) FROM professores WHERE trabalho = ?", (numero,)).fetchone()[0] == 0:
+        with conexao:
+            conexao.execute("BEGIN")
+            conexao.executemany(
+                "INSERT INTO professores (trabalho, indice, matricula, nome, saida) VALUES (?, ?, ?, ?, ?)",
+                [(numero, i, gerador.chave_matricula(dados.get('Matricula')), str(dados.get('NomeProf')),
+                  os.path.join(pasta, gerador.nome_arquivo_folha(dados, ano, mes)))
+                 for i, dados in enumerate(carregado.dicionario_dados)])
+
+    # Concluídos cujo PDF sumiu voltam para a fila
+    for item in conexao.execute("SELECT indice, saida FROM professores WHERE trabalho = ? AND estado = 'concluido'",
+                                (numero,)).fetchall():
+        if not os.path.exists(item['saida']):
+            conexao.execute("UPDATE professores SET estado = 'pendente' WHERE trabalho = ? AND indice = ?",
+                            (numero, item['indice']))
+
+    pendentes = conexao.execute("SELECT indice, matricula, nome, saida FROM professores "
+                                "WHERE trabalho = ? AND estado != 'concluido' ORDER BY indice", (numero,)).fetchall()
+    total = conexao.execute("SELECT COUNT(*) FROM professores WHERE trabalho = ?", (numero,)).fetchone()[0]
+    print(f"Trabalho {numero} ({mes:02d}/{ano}): {len(pendentes)} de {total} professor(es) a gerar.")
+
+    for inicio in range(0, len(pendentes), TAMANHO_LOTE):
+        lote = pendentes[inicio:inicio + TAMANHO_LOTE]
+        tarefas, itens = [], []
+        for item in lote:
+            dados = carregado.professor(item['matricula'])
+            if dados is None:
+                conexao.execute("UPDATE professores SET estado = 'falhou', mensagens = ?, concluido_em = ? "
+                                "WHERE trabalho = ? AND indice = ?",
+                                (f"Matrícula {item['matricula']} não está mais na planilha.", agora(), numero, item['indice']))
+                continue
+            tarefas.append((dados, item['saida']))
+            itens.append(item)
+        resultados = gerador.gerar_folhas(tarefas, modelo, carregado.excel_path, carregado.planilha, jobs, ano, mes)
+        for item, (sucesso, mensagens) in zip(itens, resultados):
+            with conexao:
+                conexao.execute("BEGIN")
+                conexao.execute("UPDATE professores SET estado = ?, mensagens = ?, concluido_em = ? "
+                                "WHERE trabalho = ? AND indice = ?",
+                                ('concluido' if sucesso else 'falhou', mensagens, agora(), numero, item['indice']))
+                dar_sinal(conexao, numero)
+            print(f"  [{item['indice'] + 1}/{total}] {item['nome']}: {'ok' if sucesso else 'falhou'}")
+
+    concluidos = conexao.execute("SELECT nome, saida FROM professores WHERE trabalho = ? AND estado = 'concluido' "
+                                 "ORDER BY indice", (numero,)).fetchall()
+    if not concluidos:
+        encerrar_trabalho(conexao, numero, 'falhou', erro="Nenhuma folha gerada.")
+        return
+    falhas = [linha['nome'] for linha in conexao.execute(
+        "SELECT nome FROM professores WHERE trabalho = ? AND estado = 'falhou' ORDER BY indice", (numero,))]
+    saida_zip = os.path.join(pasta, f"Folhas_frequencia_{ano}-{mes}.zip")
+    parcial = f"{saida_zip}.parcial"
+
+    def folhas():
+        for linha in concluidos:
+            with open(linha['saida'], 'rb') as f:
+                yield os.path.basename(linha['saida']), f.read()
+        for nome in falhas:
+            yield nome, None
+
+    with open(parcial, 'wb') as f:
+        for pedaco in gerador.fluxo_zip(folhas()):
+            f.write(pedaco)
+    os.replace(parcial, saida_zip)
+    encerrar_trabalho(conexao, numero, 'concluido', resultado=saida_zip,
+                      erro=f"{len(falhas)} folha(s) com falha" if falhas else None)
+    print(f"Trabalho {numero} concluído: {len(concluidos)} folha(s), {len(falhas)} falha(s) -> {saida_zip}")
+
+
+def trabalhar(args):
+    import geradorFolhaPonto as gerador  # só o trabalhador paga a importação do gerador
+    if not args.sem_loja:
+        gerador.configurar_loja(os.path.join(args.diretorio, PASTA_SAIDA, gerador.PASTA_LOJA_PDF))
+    conexao = conectar(args.diretorio)
+    print(f"Trabalhador {identificacao_trabalhador()} aguardando trabalhos em {caminho_banco(args.diretorio)}.")
+    try:
+        while True:
+            trabalho = pegar_trabalho(conexao)
+            if trabalho is None:
+                if args.uma_vez:
+                    break
+                time.sleep(INTERVALO_CONSULTA)
+                continue
+            try:
+                executar_trabalho(conexao, trabalho, gerador, args.diretorio, args.jobs)
+            except Exception as e:
+                # Erro inesperado: o trabalho falha, o trabalhador continua atendendo a fila
+                encerrar_trabalho(conexao, trabalho['id'], 'falhou', erro=f"{type(e).__name__}: {e}")
+                print(f"Trabalho {trabalho['id']} falhou: {e}")
+            if gerador.LOJA_PDF is not None:
+                gerador.LOJA_PDF.gravar_estatisticas()
+    except KeyboardInterrupt:
+        print("Trabalhador interrompido; o trabalho em andamento será retomado pelo próximo trabalhador.")
+    finally:
+        conexao.close()
+    return 0
+# === FIM TRABALHADOR ===
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fila de trabalhos (SQLite) para gerar as folhas de um mês em segundo plano.")
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO,
+                        help="pasta das planilhas, do modelo e de formularios_preenchidos (padrão: FOLHAS_DIRETORIO ou a pasta deste arquivo)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_enviar = comandos.add_parser("enviar", help="coloca a geração de um mês na fila")
+    p_enviar.add_argument("--mes", type=ano_mes, default=None, metavar="AAAA-MM",
+                          help="mês das folhas (padrão: o mês de referência do gerador)")
+    p_enviar.add_argument("--modelo", default="model2.pdf", metavar="ARQUIVO", help="PDF modelo (padrão: model2.pdf)")
+
+    p_status = comandos.add_parser("status", help="andamento de um trabalho (ou dos últimos, sem número)")
+    p_status.add_argument("numero", type=int, nargs="?")
+    p_status.add_argument("--professores", action="store_true", help="lista também o estado de cada professor")
+
+    p_resultado = comandos.add_parser("resultado", help="caminho do ZIP de um trabalho concluído")
+    p_resultado.add_argument("numero", type=int)
+    p_resultado.add_argument("--copiar", default=None, metavar="DESTINO", help="copia o ZIP para DESTINO")
+
+    p_trabalhar = comandos.add_parser("trabalhar", help="processo trabalhador (fica em primeiro plano)")
+    p_trabalhar.add_argument("--uma-vez", action="store_true", help="sai quando a fila estiver vazia")
+    p_trabalhar.add_argument("--jobs", type=int, default=1, metavar="N", help="processos por lote (padrão: 1)")
+    p_trabalhar.add_argument("--sem-loja", action="store_true", help="desenha todas as folhas sem consultar a loja de PDFs")
+    args = parser.parse_args(argv)
+    args.diretorio = os.path.abspath(args.diretorio)
+
+    if args.comando == "trabalhar":
+        return trabalhar(args)
+
+    conexao = conectar(args.diretorio)
+    try:
+        if args.comando == "enviar":
+            if args.mes:
+                ano, mes = args.mes
+            else:
+                import geradorFolhaPonto as gerador
+                ano, mes = gerador.mes_referencia()
+            print(enviar_trabalho(conexao, ano, mes, args.modelo))
+        elif args.comando == "status":
+            status = status_trabalho(conexao, args.numero, args.professores) if args.numero else listar_trabalhos(conexao)
+            print(json.dumps(status, ensure_ascii=False, indent=1))
+        elif args.comando == "resultado":
+            caminho = resultado_trabalho(conexao, args.numero)
+            if caminho is None:
+                print(f"Trabalho {args.numero} ainda sem resultado ({status_trabalho(conexao, args.numero)['estado']}).")
+                return 1
+            if args.copiar:
+                shutil.copyfile(caminho, args.copiar)
+                caminho = args.copiar
+            print(caminho)
+    except TrabalhoInexistente as e:
+        print(f"Erro: {e}")
+        return 1
+    finally:
+        conexao.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,44 +3,33 @@
 
 import fitz  # PyMuPDF
 import os
+import numpy as np
 import pandas as pd
 from babel.dates import format_date
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import functools
 from openpyxl import load_workbook
 import calendar
+import time
+import argparse
+import contextlib
+import io
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import json
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+import bisect
+import tempfile
+import unicodedata
 
 # ===============================
 # Parâmetros configuráveis
 # ===============================
-fontname="helv-bolditalic"
-x_base_manha = 95
-x_base_tarde = 295
-x_base_noite = 473
-
-y_start = 220
-line_height_default = 8
-line_height_extra = 10
-extra_line_start = 4
-fontsize = 6
-
-col_width_default = 20
-col_width_extra_manha = 30
-col_width_extra_tarde = 25
-col_width_extra_noite = 25
-
-extra_col_start_manha = 2
-extra_col_start_tarde = 6
-extra_col_start_noite = 3
-
-freq_line_height_default = 11  # Espaçamento vertical ajustado para montagem contínua
-freq_line_height_extra = 11        # espaçamento extra (muito pouco)
-obs_y_offset = 8
-extra_freq_start = 3               # aplicar extra a partir do índice 3 (dia 04
-
-LARGURA_RETANGULO = 21  # Largura configurável dos retângulos
-LARGURA_RETANGULO_NOITE = 20.5
-ALTURA_RETANGULO = 9
-ALTURA_RETANGULO_DOMINGO = 9
+# Coordenadas da folha (cabeçalho, grade, quadro de frequência): ver perfis_layout.json
 
 ANO_REFERENCIA = 2025
 MES_REFERENCIA = 10
@@ -56,57 +45,608 @@ dias_semana_pt = {
     'Sunday':    'Dom'
 }
 
-def inicializar_programa():
-    nome_arquivo_base = f"Base-folhaPonto-{ANO_REFERENCIA}-{MES_REFERENCIA}.xlsx"
+# === INÍCIO MEDIÇÃO DE TEMPOS ===
+ARQUIVO_RELATORIO_TEMPOS = "tempos_execucao.json"  # gravado dentro da pasta de saída
+PROFESSORES_NO_RESUMO = 5  # professores mais lentos listados no resumo do fim da execução
+
+class Medicoes:
+    """
+    Tempo de parede (perf_counter) e de CPU (process_time) por fase, separado por professor.
+    Fases aninhadas não se somam: o tempo de uma fase interna é descontado da externa, então
+    o total das fases é o tempo realmente medido. Fora de do_professor() as medições são gerais.
+    """
+    def __init__(self):
+        self.limpar()
+
+    def limpar(self):
+        self.gerais = {}
+        self.por_professor = {}
+        self.professor = None
+        self._pilha = []
+
+    def _destino(self):
+        if self.professor is None:
+            return self.gerais
+        return self.por_professor.setdefault(self.professor, {})
+
+    @contextlib.contextmanager
+    def fase(self, nome):
+        # [parede inicial, cpu inicial, parede das fases internas, cpu das fases internas]
+        marca = [time.perf_counter(), time.process_time(), 0.0, 0.0]
+        self._pilha.append(marca)
+        try:
+            yield
+        finally:
+            self._pilha.pop()
+            parede = time.perf_counter() - marca[0]
+            cpu = time.process_time() - marca[1]
+            if self._pilha:
+                self._pilha[-1][2] += parede
+                self._pilha[-1][3] += cpu
+            acumulado = self._destino().setdefault(nome, [0, 0.0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += parede - marca[2]
+            acumulado[2] += cpu - marca[3]
+
+    @contextlib.contextmanager
+    def do_professor(self, professor):
+        anterior, self.professor = self.professor, professor
+        try:
+            yield
+        finally:
+            self.professor = anterior
+
+    def retirar(self):
+        """Devolve e zera as medições (usado pelos processos do pool para enviá-las ao principal)."""
+        medicoes = {'gerais': self.gerais, 'por_professor': self.por_professor}
+        self.gerais, self.por_professor = {}, {}
+        return medicoes
+
+    def incorporar(self, medicoes):
+        destinos = [(self.gerais, medicoes['gerais'])]
+        destinos += [(self.por_professor.setdefault(p, {}), f) for p, f in medicoes['por_professor'].items()]
+        for destino, fases in destinos:
+            for nome, (chamadas, parede, cpu) in fases.items():
+                acumulado = destino.setdefault(nome, [0, 0.0, 0.0])
+                acumulado[0] += chamadas
+                acumulado[1] += parede
+                acumulado[2] += cpu
+
+    def relatorio(self):
+        """Dicionário do relatório JSON: fases agregadas, medições gerais e por professor."""
+        def formatar(fases):
+            return {nome: {'chamadas': c, 'parede_s': round(p, 6), 'cpu_s': round(u, 6)}
+                    for nome, (c, p, u) in fases.items()}
+
+        agregado = {}
+        for professor, fases in [(None, self.gerais)] + list(self.por_professor.items()):
+            for nome, (chamadas, parede, cpu) in fases.items():
+                item = agregado.setdefault(nome, {'chamadas': 0, 'parede_s': 0.0, 'cpu_s': 0.0,
+                                                  'max_parede_s': 0.0, 'professor_mais_lento': None})
+                item['chamadas'] += chamadas
+                item['parede_s'] += parede
+                item['cpu_s'] += cpu
+                if professor is not None and parede > item['max_parede_s']:
+                    item['max_parede_s'] = parede
+                    item['professor_mais_lento'] = professor
+        for item in agregado.values():
+            for campo in ('parede_s', 'cpu_s', 'max_parede_s'):
+                item[campo] = round(item[campo], 6)
+
+        professores = {}
+        for professor, fases in self.por_professor.items():
+            professores[professor] = {
+                'parede_s': round(sum(p for _, p, _ in fases.values()), 6),
+                'cpu_s': round(sum(u for _, _, u in fases.values()), 6),
+                'fases': formatar(fases),
+            }
+        return {'fases': agregado, 'gerais': formatar(self.gerais), 'professores': professores}
+
+    def gravar(self, caminho):
+        dados = dict(gerado_em=datetime.now().isoformat(timespec='seconds'), **self.relatorio())
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1)
+        os.replace(temporario, caminho)
+        return dados
+
+    def resumo(self, dados=None):
+        """Tabela curta (linhas de texto) com as fases e os professores mais lentos."""
+        dados = dados or self.relatorio()
+        linhas = [f"{'Fase':16s} {'Chamadas':>8s} {'Parede (s)':>11s} {'CPU (s)':>9s}  Professor mais lento"]
+        for nome, item in sorted(dados['fases'].items(), key=lambda par: -par[1]['parede_s']):
+            lento = item['professor_mais_lento']
+            lento = f"{lento} ({item['max_parede_s']:.3f}s)" if lento else "-"
+            linhas.append(f"{nome:16s} {item['chamadas']:8d} {item['parede_s']:11.3f} {item['cpu_s']:9.3f}  {lento}")
+        mais_lentos = sorted(dados['professores'].items(), key=lambda par: -par[1]['parede_s'])
+        if mais_lentos:
+            linhas.append("Professores mais lentos: " + ", ".join(
+                f"{professor} {item['parede_s']:.3f}s" for professor, item in mais_lentos[:PROFESSORES_NO_RESUMO]))
+        return linhas
+
+MEDICOES = Medicoes()
+
+def chave_medicao(dados, ano=None, mes=None):
+    """Identificação do professor no relatório de tempos: 'Nome (matrícula) AAAA-MM'."""
+    ano, mes = mes_referencia(ano, mes)
+    return f"{dados.get('NomeProf')} ({dados.get('Matricula')}) {ano}-{mes:02d}"
+# === FIM MEDIÇÃO DE TEMPOS ===
+
+# === INÍCIO SNAPSHOT DA PLANILHA ===
+ULTIMA_COLUNA_ABA = 17  # coluna Q, última usada pelo cabeçalho e pela grade
+LINHA_CABECALHO_ABA = 12  # rótulos do cabeçalho (Regime Juridico, Carga Horária, ...); valores na linha 13
+LINHA_INICIO_GRADE = 19   # B19:Q24 -> grade horária (Seg..Sab)
+LINHA_FIM_GRADE = 24
+LINHA_INICIO_FERIADOS = 11  # A10/B10 são rótulos, dados começam na 11
+LINHA_INICIO_HIBRIDAS = 30  # A30:F35 -> disciplinas híbridas do professor (rótulos na linha 29)
+LINHA_FIM_HIBRIDAS = 35
+COLUNAS_HIBRIDAS = 6        # Disciplina, Curso, ID-Escala-Hibrida, Dia da Semana, Periodo, Sim/Nao
+LINHA_INICIO_REMOTAS = 8    # aba CalendarioRemotas: rótulos na linha 7, períodos a partir da 8
+COLUNAS_REMOTAS = 4         # id-Escala-hibrida, id-curso-online, Inicio-online, Fim-online
+
+# Cache em disco (ao lado do xlsx) com as abas já interpretadas
+USAR_CACHE_PLANILHA = True
+VERSAO_CACHE_PLANILHA = 3  # incrementar sempre que o formato interpretado das abas mudar
+
+# Abas já interpretadas neste processo, por hash de conteúdo: uma aba idêntica em outro mês
+# (ex.: a grade do professor que não mudou) não é interpretada de novo. Limitado (LRU), porque no
+# daemon e na aplicação web cada edição salva da planilha acrescentaria as abas alteradas para sempre
+_ABAS_POR_HASH = {}
+LIMITE_ABAS_POR_HASH = 2000
+
+def _aba_por_hash(chave, hash_aba):
+    """Aba já interpretada com esse hash (e a marca como usada agora), ou None."""
+    dados = _ABAS_POR_HASH.pop((chave, hash_aba), None)
+    if dados is not None:
+        _ABAS_POR_HASH[(chave, hash_aba)] = dados
+    return dados
+
+def _guardar_aba_por_hash(chave, hash_aba, dados):
+    _ABAS_POR_HASH.pop((chave, hash_aba), None)
+    _ABAS_POR_HASH[(chave, hash_aba)] = dados
+    while len(_ABAS_POR_HASH) > LIMITE_ABAS_POR_HASH:
+        # dicionários mantêm a ordem de inserção: a primeira chave é a usada há mais tempo
+        _ABAS_POR_HASH.pop(next(iter(_ABAS_POR_HASH)), None)
+
+# Contador de leituras completas da planilha base (deve ser 1 por execução; 0 com cache quente)
+CONTADOR_LEITURAS_PLANILHA = 0
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _serializar_valor(val):
+    # datetime não é JSON: guarda em ISO e restaura em _restaurar_valor
+    if isinstance(val, datetime):
+        return {'$dt': val.isoformat()}
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if isinstance(val, (list, tuple)):
+        return [_serializar_valor(v) for v in val]
+    if isinstance(val, dict):
+        return {k: _serializar_valor(v) for k, v in val.items()}
+    return str(val)
+
+def _restaurar_valor(val):
+    if isinstance(val, dict):
+        if set(val) == {'$dt'}:
+            return datetime.fromisoformat(val['$dt'])
+        return {k: _restaurar_valor(v) for k, v in val.items()}
+    if isinstance(val, list):
+        return [_restaurar_valor(v) for v in val]
+    return val
+
+def hashes_abas_xlsx(excel_path):
+    """
+    Hash de cada aba a partir do XML dentro do .xlsx, sem passar pelo openpyxl.
+    Inclui as strings compartilhadas que a aba referencia, pois o Excel pode renumerá-las ao salvar.
+    Retorna (lista de abas na ordem do arquivo, {aba: hash}).
+    """
+    ns_main = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    ns_rel = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+    with zipfile.ZipFile(excel_path) as z:
+        nomes_zip = set(z.namelist())
+        rels = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+        alvos = {r.get('Id'): r.get('Target') for r in rels}
+        strings = []
+        if 'xl/sharedStrings.xml' in nomes_zip:
+            strings = re.findall(rb'<si>.*?</si>', z.read('xl/sharedStrings.xml'), re.S)
+        estilos = z.read('xl/styles.xml') if 'xl/styles.xml' in nomes_zip else b''
+        hash_estilos = hashlib.sha256(estilos).digest()
+
+        abas, hashes = [], {}
+        for sheet in ET.fromstring(z.read('xl/workbook.xml')).iter(f'{ns_main}sheet'):
+            nome = sheet.get('name')
+            alvo = alvos.get(sheet.get(f'{ns_rel}id'), '')
+            caminho = alvo.lstrip('/') if alvo.startswith('/') else f'xl/{alvo}'
+            abas.append(nome)
+            if caminho not in nomes_zip:
+                continue
+            xml = z.read(caminho)
+            h = hashlib.sha256(xml)
+            h.update(hash_estilos)  # formatos de data vêm de styles.xml
+            for idx in re.findall(rb'<c [^>]*t="s"[^>]*>\s*<v>(\d+)</v>', xml):
+                i = int(idx)
+                h.update(strings[i] if i < len(strings) else b'')
+            hashes[nome] = h.hexdigest()
+    return abas, hashes
+
+class PlanilhaBase:
+    """
+    Snapshot da planilha Base-folhaPonto-AAAA-M.xlsx, lido uma única vez por execução.
+    Todas as etapas (parametros, cabeçalho das abas, grades e feriados) leem daqui.
+    O arquivo é aberto em modo somente leitura (streaming); cada aba de professor é
+    varrida uma única vez e o resultado fica guardado em memória.
+
+    Com USAR_CACHE_PLANILHA, as abas interpretadas também ficam num arquivo
+    '<xlsx>.cache.json' ao lado da planilha. Se o hash do arquivo não mudou, nada é
+    relido; caso contrário só as abas cujo XML mudou passam pelo openpyxl.
+    """
+    def __init__(self, excel_path, usar_cache=None, estado=None):
+        self.excel_path = excel_path
+        self.usar_cache = USAR_CACHE_PLANILHA if usar_cache is None else usar_cache
+        self._wb = None
+        self._memoria = {}
+        self._hashes_abas = None
+        self.acertos_cache = []
+        self.falhas_cache = []
+        self._cache_alterado = False
+        self.feriados_calculados = {}  # (ano, mes) -> {dia: descricao}, ver carregar_feriados
+        self.remotas_indexadas = None  # IndiceRemotas da aba CalendarioRemotas, ver indice_remotas
+
+        self.caminho_cache = f"{excel_path}.cache.json"
+        if estado is not None:
+            # Processo filho (--jobs): recebe pronto o que o processo principal já leu
+            self.usar_cache = False
+            self.hash_arquivo = None
+            self._cache = {}
+            self._arquivo_inalterado = False
+            self.sheetnames = estado['sheetnames']
+            self._memoria = estado['memoria']
+            return
+
+        self.hash_arquivo = hash_arquivo(excel_path) if self.usar_cache else None
+        self._cache = self._carregar_cache()
+        self._arquivo_inalterado = self._cache.get('hash_arquivo') == self.hash_arquivo and 'abas' in self._cache
+
+        if self._arquivo_inalterado:
+            self.sheetnames = self._cache['sheetnames']
+        elif self.usar_cache:
+            self.sheetnames, self._hashes_abas = hashes_abas_xlsx(excel_path)
+            self._cache = {'versao': VERSAO_CACHE_PLANILHA, 'hash_arquivo': self.hash_arquivo,
+                           'sheetnames': self.sheetnames, 'hashes_abas': self._hashes_abas,
+                           'abas': self._cache.get('abas', {})}
+            self._cache_alterado = True
+        else:
+            self.sheetnames = self.wb.sheetnames
+
+    @property
+    def wb(self):
+        # O openpyxl só é acionado quando alguma aba não está no cache
+        global CONTADOR_LEITURAS_PLANILHA
+        if self._wb is None:
+            with MEDICOES.fase('carga_planilha'):
+                self._wb = load_workbook(self.excel_path, data_only=True, read_only=True)
+            CONTADOR_LEITURAS_PLANILHA += 1
+        return self._wb
+
+    def _carregar_cache(self):
+        if not self.usar_cache or not os.path.exists(self.caminho_cache):
+            return {}
+        try:
+            with open(self.caminho_cache, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Cache da planilha ignorado ({e}).")
+            return {}
+        if cache.get('versao') != VERSAO_CACHE_PLANILHA:
+            return {}
+        return cache
+
+    def _obter(self, chave, aba, ler):
+        """Devolve o conteúdo interpretado de uma aba: memória -> cache em disco -> openpyxl."""
+        if chave in self._memoria:
+            return self._memoria[chave]
+        if self.usar_cache:
+            entrada = self._cache['abas'].get(chave)
+            hash_atual = None if self._arquivo_inalterado else self._hashes_abas.get(aba)
+            if entrada and (self._arquivo_inalterado or entrada.get('hash') == hash_atual):
+                hash_atual = entrada.get('hash')
+                dados = _aba_por_hash(chave, hash_atual) or _restaurar_valor(entrada['dados'])
+                self.acertos_cache.append(chave)
+            else:
+                dados = _aba_por_hash(chave, hash_atual) if hash_atual else None
+                if dados is None:
+                    dados = ler()
+                    self.falhas_cache.append(chave)
+                else:
+                    self.acertos_cache.append(chave)
+                self._cache['abas'][chave] = {'hash': hash_atual, 'dados': _serializar_valor(dados)}
+                self._cache_alterado = True
+            if hash_atual:
+                _guardar_aba_por_hash(chave, hash_atual, dados)
+        else:
+            dados = ler()
+        self._memoria[chave] = dados
+        return dados
+
+    def aba(self, nome):
+        return self.wb[nome]
+
+    def estado(self, abas):
+        """Lê parametros, feriados, remotas e as abas indicadas e devolve um dicionário serializável (pickle)."""
+        self.parametros_df()
+        if 'feriados' in self.sheetnames:
+            self.linhas_feriados()
+        if 'CalendarioRemotas' in self.sheetnames:
+            self.linhas_calendario_remotas()
+        for aba in abas:
+            if aba in self.sheetnames:
+                self.ler_aba_professor(aba)
+        return {'sheetnames': list(self.sheetnames), 'memoria': dict(self._memoria)}
+
+    def hash_aba(self, nome):
+        """Hash do conteúdo de uma aba (None se a aba não existe)."""
+        if self._hashes_abas is None:
+            if self._arquivo_inalterado and 'hashes_abas' in self._cache:
+                self._hashes_abas = self._cache['hashes_abas']
+            else:
+                _, self._hashes_abas = hashes_abas_xlsx(self.excel_path)
+        return self._hashes_abas.get(nome)
+
+    def fechar(self):
+        # O modo somente leitura mantém o arquivo aberto até o close()
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+        if self.usar_cache and self._cache_alterado:
+            self._gravar_cache()
+            self._cache_alterado = False
+
+    def _gravar_cache(self):
+        # Descarta abas que não existem mais no arquivo e grava de forma atômica
+        self._cache['abas'] = {k: v for k, v in self._cache['abas'].items() if k in self.sheetnames}
+        temporario = f"{self.caminho_cache}.tmp"
+        try:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temporario, self.caminho_cache)
+        except OSError as e:
+            print(f"Não foi possível gravar o cache da planilha: {e}")
+
+    def relatorio_cache(self):
+        if not self.usar_cache:
+            return "Cache da planilha desativado."
+        texto = f"Cache da planilha: {len(self.acertos_cache)} acerto(s), {len(self.falhas_cache)} falha(s)"
+        if self._arquivo_inalterado:
+            texto += " (arquivo inalterado)"
+        if self.falhas_cache:
+            texto += f" - abas interpretadas: {', '.join(self.falhas_cache)}"
+        return texto
+
+    def parametros_df(self):
+        # Mesmo formato do pd.read_excel(sheet_name='parametros'): linha 1 é o cabeçalho
+        linhas = self._obter('parametros', 'parametros',
+                             lambda: [list(l) for l in self.wb['parametros'].iter_rows(values_only=True)])
+        # Arquivos gravados sem a dimensão da aba trazem linhas de tamanhos diferentes
+        largura = max(map(len, linhas), default=0)
+        linhas = [l + [None] * (largura - len(l)) for l in linhas]
+        return pd.DataFrame(linhas[1:], columns=[f"Unnamed: {i}" for i in range(largura)])
+
+    def linhas_feriados(self):
+        """Colunas A/B da aba 'feriados' a partir da linha 11, numa única varredura."""
+        return self._obter('feriados', 'feriados', lambda: [
+            list(l) for l in self.wb['feriados'].iter_rows(min_row=LINHA_INICIO_FERIADOS, max_col=2, values_only=True)])
+
+    def linhas_calendario_remotas(self):
+        """Colunas A..D da aba 'CalendarioRemotas' a partir da linha 8, numa única varredura."""
+        return self._obter('CalendarioRemotas', 'CalendarioRemotas', lambda: [
+            list(l) for l in self.wb['CalendarioRemotas'].iter_rows(
+                min_row=LINHA_INICIO_REMOTAS, max_col=COLUNAS_REMOTAS, values_only=True)])
+
+    def ler_aba_professor(self, aba):
+        return self._obter(aba, aba, lambda: self._varrer_aba_professor(aba))
+
+    def _varrer_aba_professor(self, aba):
+        """
+        Varre as linhas 12 a 35 (colunas A..Q) da aba numa única passada:
+        - linha 12/13: rótulos e valores do cabeçalho
+        - B19:Q24: grades manhã (B..G), tarde (H..M) e noite (N..Q)
+        - A30:F35: disciplinas híbridas
+        """
+        vazio = (None,) * ULTIMA_COLUNA_ABA
+        rotulos = valores = vazio
+        grade = []
+        hibridas = []
+        # Limita às colunas A..Q: as abas dos professores têm milhares de colunas vazias formatadas
+        linhas = self.wb[aba].iter_rows(min_row=LINHA_CABECALHO_ABA, max_row=LINHA_FIM_HIBRIDAS,
+                                        max_col=ULTIMA_COLUNA_ABA, values_only=True)
+        for num_linha, linha in enumerate(linhas, start=LINHA_CABECALHO_ABA):
+            linha = tuple(linha) + vazio[len(linha):]
+            if num_linha == LINHA_CABECALHO_ABA:
+                rotulos = linha
+            elif num_linha == LINHA_CABECALHO_ABA + 1:
+                valores = linha
+            elif LINHA_INICIO_GRADE <= num_linha <= LINHA_FIM_GRADE:
+                grade.append([tratar_valor(v) for v in linha[1:]])
+            elif num_linha >= LINHA_INICIO_HIBRIDAS:
+                hibridas.append(list(linha[:COLUNAS_HIBRIDAS]))
+        # Abas mais curtas que a linha 24: completa a grade com células vazias
+        while len(grade) < LINHA_FIM_GRADE - LINHA_INICIO_GRADE + 1:
+            grade.append([tratar_valor(None)] * (ULTIMA_COLUNA_ABA - 1))
+
+        cabecalho = None
+        if any(v is not None for v in valores):
+            cabecalho = {str(r).strip(): v for r, v in zip(rotulos, valores) if r is not None}
+
+        return {
+            'cabecalho': cabecalho,
+            'grade_manha': [linha[0:6] for linha in grade],
+            'grade_tarde': [linha[6:12] for linha in grade],
+            'grade_noite': [linha[12:16] for linha in grade],
+            'hibridas': hibridas,
+        }
+
+    def cabecalho_aba(self, aba):
+        """Equivalente a pd.read_excel(header=11).iloc[0]: rótulos na linha 12, valores na linha 13."""
+        return self.ler_aba_professor(aba)['cabecalho']
+
+def obter_planilha(excel_path, planilha=None):
+    """Reaproveita o snapshot recebido; só lê o arquivo se nenhum snapshot foi informado."""
+    if planilha is not None:
+        return planilha
+    return PlanilhaBase(excel_path)
+# === FIM SNAPSHOT DA PLANILHA ===
+
+def mes_referencia(ano=None, mes=None):
+    """(ano, mes) informados ou, na falta deles, ANO_REFERENCIA/MES_REFERENCIA."""
+    return (ANO_REFERENCIA if ano is None else ano), (MES_REFERENCIA if mes is None else mes)
+
+def inicializar_programa(planilha=None, ano=None, mes=None, diretorio=""):
+    ano, mes = mes_referencia(ano, mes)
+    nome_arquivo_base = os.path.join(diretorio, f"Base-folhaPonto-{ano}-{mes}.xlsx")
     if not os.path.exists(nome_arquivo_base):
         print(f"Arquivo {nome_arquivo_base} não encontrado.")
         return None
 
-    df_parametros = pd.read_excel(nome_arquivo_base, sheet_name='parametros', engine='openpyxl')
+    # O load_workbook em si é medido como 'carga_planilha' em PlanilhaBase.wb, quando (e se) acontece;
+    # aqui é só a abertura do snapshot: hash do arquivo, cache em disco e índice das abas
+    with MEDICOES.fase('abrir_planilha'):
+        planilha = obter_planilha(nome_arquivo_base, planilha)
+    with MEDICOES.fase('parametros'):
+        df_parametros = planilha.parametros_df()
     ano_base = int(df_parametros.iloc[3, 1])
     mes_base = int(df_parametros.iloc[4, 1])
 
-    if ano_base != ANO_REFERENCIA or mes_base != MES_REFERENCIA:
-        print(f"Erro: Ano/Mês base do arquivo ({ano_base}/{mes_base}) não corresponde ao esperado ({ANO_REFERENCIA}/{MES_REFERENCIA}).")
+    if ano_base != ano or mes_base != mes:
+        print(f"Erro: Ano/Mês base do arquivo ({ano_base}/{mes_base}) não corresponde ao esperado ({ano}/{mes}).")
         return None
 
-    data = datetime(ANO_REFERENCIA, MES_REFERENCIA, 1)
+    data = datetime(ano, mes, 1)
     nome_mes = format_date(data, "MMMM", locale="pt_BR")
-    print(f"Atenção, estamos a processar a folha do mês/ano: {nome_mes}/{ANO_REFERENCIA}")
+    print(f"Atenção, estamos a processar a folha do mês/ano: {nome_mes}/{ano}")
 
     df_dados = df_parametros.iloc[INICIO_DADOS_PROFESSOR:, [0, 1, 2, 3]]
     df_dados.columns = ['Sequencia', 'Matricula', 'NomeProf', 'Nome da Aba']
     df_dados = df_dados.dropna(how='all')
 
     dicionario_dados = df_dados.to_dict(orient='records')
-    return ANO_REFERENCIA, MES_REFERENCIA, df_parametros, dicionario_dados
+    return ano, mes, df_parametros, dicionario_dados, planilha
+
+# === INÍCIO MODELO EM MEMÓRIA ===
+# Bytes do PDF modelo, lidos do disco uma única vez por processo (chave: caminho + data de modificação)
+_MODELOS_EM_MEMORIA = {}
+_HASHES_MODELOS = {}
+
+# Validação opcional do modelo (--validar-modelo): A4 retrato, em pontos
+PAGINAS_MINIMAS_MODELO = 1
+TAMANHO_PAGINA_MODELO = (595, 842)
+TOLERANCIA_TAMANHO_MODELO = 2
+
+def bytes_modelo(modelo_path):
+    chave = (os.path.abspath(modelo_path), os.path.getmtime(modelo_path))
+    conteudo = _MODELOS_EM_MEMORIA.get(chave)
+    if conteudo is None:
+        with open(modelo_path, 'rb') as f:
+            conteudo = f.read()
+        _MODELOS_EM_MEMORIA.clear()  # um modelo alterado em disco substitui a versão anterior
+        _MODELOS_EM_MEMORIA[chave] = conteudo
+    return conteudo
+
+def hash_do_modelo(modelo_path):
+    """SHA-256 do modelo, calculado uma vez por versão do arquivo (mesma chave de bytes_modelo)."""
+    chave = (os.path.abspath(modelo_path), os.path.getmtime(modelo_path))
+    if chave not in _HASHES_MODELOS:
+        _HASHES_MODELOS.clear()
+        _HASHES_MODELOS[chave] = hashlib.sha256(bytes_modelo(modelo_path)).hexdigest()
+    return _HASHES_MODELOS[chave]
+
+def abrir_modelo(modelo_path):
+    """Cria o documento de um professor a partir do modelo em memória, sem reabrir o arquivo."""
+    return fitz.open(stream=bytes_modelo(modelo_path), filetype="pdf")
+
+def validar_modelo(modelo_path):
+    """Confere, uma vez no início, se o modelo tem páginas e o tamanho esperados."""
+    try:
+        doc = abrir_modelo(modelo_path)
+    except Exception as e:
+        print(f"Erro ao abrir o modelo '{modelo_path}': {e}")
+        return False
+    with doc:
+        if len(doc) < PAGINAS_MINIMAS_MODELO:
+            print(f"Modelo '{modelo_path}' tem {len(doc)} página(s); esperado ao menos {PAGINAS_MINIMAS_MODELO}.")
+            return False
+        largura, altura = doc[0].rect.width, doc[0].rect.height
+        if abs(largura - TAMANHO_PAGINA_MODELO[0]) > TOLERANCIA_TAMANHO_MODELO or \
+           abs(altura - TAMANHO_PAGINA_MODELO[1]) > TOLERANCIA_TAMANHO_MODELO:
+            print(f"Modelo '{modelo_path}' tem página {largura:.0f}x{altura:.0f}; "
+                  f"esperado {TAMANHO_PAGINA_MODELO[0]}x{TAMANHO_PAGINA_MODELO[1]}.")
+            return False
+    return True
+# === FIM MODELO EM MEMÓRIA ===
+
+# === INÍCIO MESES EM MEMÓRIA ===
+# Para processos de longa duração (daemon_folhas.py, app_folhas.py): planilha de cada mês com todas
+# as abas já interpretadas e os professores por matrícula, relida só quando o xlsx muda em disco
+_MESES_EM_MEMORIA = {}
+
+def chave_matricula(valor):
+    """Matrícula normalizada: o pandas pode trazer 1000001.0 onde a planilha tem 1000001."""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+class MesEmMemoria:
+    """Snapshot de uma planilha mensal pronto para gerar a folha de qualquer professor."""
+    def __init__(self, ano, mes, excel_path, mtime, planilha, dicionario_dados):
+        self.ano = ano
+        self.mes = mes
+        self.excel_path = excel_path
+        self.mtime = mtime
+        self.planilha = planilha
+        self.dicionario_dados = dicionario_dados
+        self.professores = {chave_matricula(dados.get("Matricula")): dados for dados in dicionario_dados}
+
+    def professor(self, matricula):
+        return self.professores.get(chave_matricula(matricula))
+
+def mes_em_memoria(ano, mes, diretorio=""):
+    """MesEmMemoria de (ano, mes), carregado na primeira chamada ou quando a planilha muda; None se inválido."""
+    excel_path = os.path.join(diretorio, f"Base-folhaPonto-{ano}-{mes}.xlsx")
+    if not os.path.exists(excel_path):
+        print(f"Arquivo {excel_path} não encontrado.")
+        return None
+    mtime = os.path.getmtime(excel_path)
+    chave = (os.path.abspath(excel_path), ano, mes)
+    carregado = _MESES_EM_MEMORIA.get(chave)
+    if carregado is None or carregado.mtime != mtime:
+        resultado = inicializar_programa(ano=ano, mes=mes, diretorio=diretorio)
+        if resultado is None:
+            return None
+        _, _, _, dicionario_dados, planilha = resultado
+        # Interpreta de uma vez as abas de todos os professores, feriados e remotas (ou tira do cache em disco)
+        abas = {aba.strip() for dados in dicionario_dados for aba in str(dados.get("Nome da Aba", "")).split(",")}
+        planilha.estado(sorted(a for a in abas if a))
+        planilha.fechar()
+        carregado = _MESES_EM_MEMORIA[chave] = MesEmMemoria(ano, mes, excel_path, mtime, planilha, dicionario_dados)
+    return carregado
+# === FIM MESES EM MEMÓRIA ===
 
 def tratar_valor(val):
     if pd.isna(val) or str(val).strip().lower() == 'nan' or str(val).strip() == '':
         return '......'
     return str(val).strip()
 
-def extrair_grades(excel_path, aba):
-    wb = load_workbook(excel_path, data_only=True)
-    if aba not in wb.sheetnames:
+def extrair_grades(excel_path, aba, planilha=None):
+    planilha = obter_planilha(excel_path, planilha)
+    if aba not in planilha.sheetnames:
         raise ValueError(f"Aba '{aba}' não encontrada no arquivo Excel.")
-    sheet = wb[aba]
-
-    def extrair_matriz(inicio_col, fim_col, inicio_row, fim_row):
-        matriz = []
-        for r in range(inicio_row, fim_row + 1):
-            linha = []
-            for c in range(ord(inicio_col), ord(fim_col) + 1):
-                cell_value = sheet[f"{chr(c)}{r}"].value
-                linha.append(tratar_valor(cell_value))
-            matriz.append(linha)
-        return matriz
-
-    grade_manha = extrair_matriz('B', 'G', 19, 24)
-    grade_tarde = extrair_matriz('H', 'M', 19, 24)
-    grade_noite = extrair_matriz('N', 'Q', 19, 24)
-
-    return grade_manha, grade_tarde, grade_noite
+    aba_lida = planilha.ler_aba_professor(aba)
+    return aba_lida['grade_manha'], aba_lida['grade_tarde'], aba_lida['grade_noite']
 #xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
 def montar_folha_frequencia1(ano, mes):
     """
@@ -131,69 +671,357 @@ def montar_folha_frequencia1(ano, mes):
     return folha
 
 
+# === INÍCIO GRADE EM BITMASK ===
+# Cada dia da grade vira um inteiro de 16 bits: bits 0-5 manhã, 6-11 tarde, 12-15 noite
+DIAS_GRADE = ('Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sab')  # linhas 19 a 24 da grade horária
+DIAS_SEMANA_ABREV = ('Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sab', 'Dom')  # calendar.weekday: 0 = segunda
+TURNOS = {'manha': (0, 6), 'tarde': (6, 6), 'noite': (12, 4)}  # turno -> (primeiro bit, nº de aulas)
+
 def mapear_grade_para_dias(grade_manha, grade_tarde, grade_noite):
-    dias = ['Seq', 'Ter', 'Qua', 'Qui', 'Sex', 'Sab']
-    mapa = {dia: {'manha': [False]*6, 'tarde': [False]*6, 'noite': [False]*4} for dia in dias}
-
-    for i, dia in enumerate(dias):
-        for j in range(6):
-            if grade_manha[i][j].lower() == 'x':
-                mapa[dia]['manha'][j] = True
-        for j in range(6):
-            if grade_tarde[i][j].lower() == 'x':
-                mapa[dia]['tarde'][j] = True
-        for j in range(4):
-            if grade_noite[i][j].lower() == 'x':
-                mapa[dia]['noite'][j] = True
+    """Retorna {dia: máscara de 16 bits} com um bit ligado para cada aula marcada com 'x'."""
+    mapa = {}
+    for i, dia in enumerate(DIAS_GRADE):
+        mascara = 0
+        for bit, val in enumerate(grade_manha[i] + grade_tarde[i] + grade_noite[i]):
+            if val.lower() == 'x':
+                mascara |= 1 << bit
+        mapa[dia] = mascara
     return mapa
 
-def montar_folha_frequencia(ano, mes, mapa_grade):
+def combinar_mapas_grade(*mapas):
+    """Junta as grades de várias abas do mesmo professor (OU bit a bit por dia)."""
+    combinado = dict.fromkeys(DIAS_GRADE, 0)
+    for mapa in mapas:
+        for dia, mascara in mapa.items():
+            combinado[dia] = combinado.get(dia, 0) | mascara
+    return combinado
+
+def juntar_grades(grades_abas):
+    """
+    Grade (manhã, tarde, noite) de um professor com várias abas: o texto das células vem da última
+    aba, e uma aula marcada com 'x' em qualquer aba fica marcada (combinar_mapas_grade).
+    """
+    if not grades_abas:
+        return [], [], []
+    if len(grades_abas) == 1:
+        return grades_abas[0]
+    mapa = combinar_mapas_grade(*(mapear_grade_para_dias(*grades) for grades in grades_abas))
+    juntas = tuple([list(linha) for linha in grade] for grade in grades_abas[-1])
+    for i, dia in enumerate(DIAS_GRADE):
+        for (inicio, _), grade in zip(TURNOS.values(), juntas):
+            for j in range(len(grade[i])):
+                if mapa[dia] >> (inicio + j) & 1 and grade[i][j].lower() != 'x':
+                    grade[i][j] = 'x'
+    return juntas
+
+def bits_turno(mascara, turno):
+    """Aulas de um turno, deslocadas para o bit 0 (aula 1)."""
+    inicio, quantidade = TURNOS[turno]
+    return (mascara >> inicio) & ((1 << quantidade) - 1)
+
+def intervalo_turno(mascara, turno):
+    """(primeira, última) aula do turno, ou None se não há aula; é o retângulo contínuo da folha."""
+    bits = bits_turno(mascara, turno)
+    if not bits:
+        return None
+    return (bits & -bits).bit_length() - 1, bits.bit_length() - 1
+
+def segmentos_turno(mascara, turno):
+    """Blocos de aulas consecutivas do turno: [(primeira, última), ...]."""
+    bits = bits_turno(mascara, turno)
+    segmentos = []
+    while bits:
+        primeira = (bits & -bits).bit_length() - 1
+        bloco = bits >> primeira
+        tamanho = (~bloco & (bloco + 1)).bit_length() - 1  # quantidade de 1s seguidos
+        segmentos.append((primeira, primeira + tamanho - 1))
+        bits &= ~(((1 << tamanho) - 1) << primeira)
+    return segmentos
+
+class LinhaFrequencia:
+    """Uma linha (dia) do quadro de frequência."""
+    __slots__ = ('dia', 'dia_semana', 'mascara', 'remotas')
+
+    def __init__(self, dia, dia_semana, mascara, remotas=0):
+        self.dia = dia
+        self.dia_semana = dia_semana
+        self.mascara = mascara
+        self.remotas = remotas  # bits das aulas do dia que são remotas (subconjunto de mascara)
+
+# === FIM GRADE EM BITMASK ===
+
+# === INÍCIO MATRIZ DO MÊS (NumPy) ===
+# Quadro do mês como matriz dias x 16 aulas: 0 = sem aula, AULA_PRESENCIAL, AULA_REMOTA
+SLOTS_DIA = 16
+AULA_PRESENCIAL = 1
+AULA_REMOTA = 2
+PESOS_BITS = 1 << np.arange(SLOTS_DIA, dtype=np.int64)
+IDX_DOMINGO = DIAS_SEMANA_ABREV.index('Dom')
+
+def grade_semanal(mapa_grade):
+    """Matriz booleana 7 x 16 (Seg..Dom x aulas) a partir das máscaras de bits da grade."""
+    mascaras = np.array([mapa_grade.get(dia, 0) for dia in DIAS_SEMANA_ABREV], dtype=np.int64)
+    return (mascaras[:, None] & PESOS_BITS) != 0
+
+def dias_semana_do_mes(ano, mes):
+    """Índice do dia da semana (0 = segunda) de cada dia do mês."""
     num_dias = calendar.monthrange(ano, mes)[1]
-    folha = []
-    for dia in range(1, num_dias + 1):
-        data = datetime(ano, mes, dia)
-        dia_semana_en = data.strftime('%A')
-        dia_semana_pt_nome = dias_semana_pt.get(dia_semana_en, dia_semana_en)
-        freq_manha = [''] * 6
-        freq_tarde = [''] * 6
-        freq_noite = [''] * 4
-        if dia_semana_pt_nome in mapa_grade:
-            for i in range(6):
-                if mapa_grade[dia_semana_pt_nome]['manha'][i]:
-                    freq_manha[i] = 'cinza'
-            for i in range(6):
-                if mapa_grade[dia_semana_pt_nome]['tarde'][i]:
-                    freq_tarde[i] = 'cinza'
-            for i in range(4):
-                if mapa_grade[dia_semana_pt_nome]['noite'][i]:
-                    freq_noite[i] = 'cinza'
-        folha.append({
-            'Dia do Mês': f"{dia:02d}",
-            'Dia da Semana': dia_semana_pt_nome,
-            'Assinatura-Manhã': '',
-            'Frequência-Manhã': freq_manha,
-            'Assinatura-Tarde': '',
-            'Frequência-Tarde': freq_tarde,
-            'Assinatura-Noite': '',
-            'Frequência-Noite': freq_noite
-        })
-    return folha
+    return (calendar.weekday(ano, mes, 1) + np.arange(num_dias)) % 7
+
+def mascara_dias_livres(ano, mes, feriados_do_mes=()):
+    """Vetor booleano por dia do mês: True nos domingos e feriados."""
+    semana = dias_semana_do_mes(ano, mes)
+    feriados = mascara_feriados(feriados_do_mes)
+    return (semana == IDX_DOMINGO) | (((feriados >> np.arange(len(semana))) & 1) == 1)
+
+def matriz_frequencia(ano, mes, mapa_grade, feriados_do_mes=(), remotas=None):
+    """
+    Matriz dias x 16 do mês: a grade semanal é espalhada pelos dias conforme o dia da semana,
+    domingos e feriados são zerados e, se informada, a máscara 'remotas' (dias x 16, booleana)
+    marca as aulas remotas.
+    """
+    semana = dias_semana_do_mes(ano, mes)
+    aulas = grade_semanal(mapa_grade)[semana]
+    aulas &= ~mascara_dias_livres(ano, mes, feriados_do_mes)[:, None]
+    matriz = aulas.astype(np.uint8) * AULA_PRESENCIAL
+    if remotas is not None:
+        matriz[aulas & remotas] = AULA_REMOTA
+    return matriz
+
+def mascaras_dos_dias(matriz, tipo=None):
+    """
+    Converte as linhas da matriz de volta para máscaras de 16 bits (uma por dia);
+    com 'tipo' (AULA_PRESENCIAL/AULA_REMOTA) só as aulas desse tipo.
+    """
+    aulas = matriz != 0 if tipo is None else matriz == tipo
+    return (aulas * PESOS_BITS).sum(axis=-1)
+
+def contar_aulas(matriz):
+    """
+    Aulas por turno no mês. Aceita uma matriz (dias x 16) ou a pilha da faculdade
+    (professores x dias x 16); nesse caso cada valor é um vetor com um total por professor.
+    """
+    com_aula = matriz != 0
+    contagem = {}
+    for turno, (inicio, quantidade) in TURNOS.items():
+        contagem[turno] = com_aula[..., inicio:inicio + quantidade].sum(axis=(-2, -1))
+    contagem['total'] = com_aula.sum(axis=(-2, -1))
+    contagem['remotas'] = (matriz == AULA_REMOTA).sum(axis=(-2, -1))
+    return contagem
+
+def montar_folha_frequencia(ano, mes, mapa_grade, feriados_do_mes=(), remotas=None):
+    """Linhas do quadro de frequência (LinhaFrequencia) a partir da matriz do mês."""
+    matriz = matriz_frequencia(ano, mes, mapa_grade, feriados_do_mes, remotas)
+    semana = dias_semana_do_mes(ano, mes)
+    colunas = zip(semana.tolist(), mascaras_dos_dias(matriz).tolist(), mascaras_dos_dias(matriz, AULA_REMOTA).tolist())
+    return [LinhaFrequencia(dia, DIAS_SEMANA_ABREV[idx], mascara, remotas)
+            for dia, (idx, mascara, remotas) in enumerate(colunas, start=1)]
+
+def relatorio_aulas(dicionario_dados, excel_path, planilha, ano, mes, saida_csv):
+    """
+    Relatório de aulas (horas-aula) do mês por professor. As matrizes de todos os professores
+    são empilhadas (professores x dias x 16) e contadas de uma vez.
+    """
+    linhas, matrizes = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for dados in dicionario_dados:
+            with MEDICOES.do_professor(chave_medicao(dados, ano, mes)):
+                lidos = ler_dados_professor(dados, excel_path, planilha, ano, mes)
+            if lidos is None or not lidos[1][0]:
+                continue
+            _, grades, feriados_do_mes, remotas = lidos
+            matrizes.append(matriz_frequencia(ano, mes, mapear_grade_para_dias(*grades), feriados_do_mes, remotas))
+            linhas.append({'Matricula': dados.get('Matricula'), 'NomeProf': dados.get('NomeProf')})
+    if not matrizes:
+        print("Relatório de aulas: nenhum professor com grade válida.")
+        return None
 
-def desenhar_retangulo_continuo(current_page, x_inicio, y, lista_freq, largura_unitaria=LARGURA_RETANGULO, altura=ALTURA_RETANGULO):
-    indices = [i for i, val in enumerate(lista_freq) if val == 'cinza']
-    if indices:
-        primeiro = min(indices)
-        ultimo = max(indices)
-        x1 = x_inicio + primeiro * largura_unitaria
-        x2 = x_inicio + (ultimo + 1) * largura_unitaria
-        rect = fitz.Rect(x1, y - altura/2, x2, y + altura/2)
+    contagem = contar_aulas(np.stack(matrizes))
+    df = pd.DataFrame(linhas)
+    for coluna in ('manha', 'tarde', 'noite', 'total', 'remotas'):
+        df[f"aulas_{coluna}"] = contagem[coluna]
+    df.to_csv(saida_csv, index=False, sep=';', encoding='utf-8-sig')
+    print(f"Relatório de aulas salvo em: {saida_csv} ({len(df)} professor(es), {int(df['aulas_total'].sum())} aulas no mês)")
+    return df
+# === FIM MATRIZ DO MÊS (NumPy) ===
+
+# === INÍCIO DESENHO EM LOTE ===
+class PincelLote:
+    """
+    Acumula os retângulos e textos de uma página num único fitz.Shape e grava o
+    content stream de uma vez em commit(). Tem os mesmos métodos usados da página
+    (draw_rect/insert_text/rect), então as funções de desenho aceitam página ou pincel.
+    """
+    def __init__(self, page):
+        self.page = page
+        self.rect = page.rect
+        self.shape = page.new_shape()
+        self.operacoes = 0
+
+    def draw_rect(self, rect, color=None, fill=None, width=1):
+        self.shape.draw_rect(rect)
+        self.shape.finish(color=color, fill=fill, width=width)
+        self.operacoes += 1
+
+    def insert_text(self, point, text, fontsize=11, fontname="helv", color=None, fill=None):
+        self.shape.insert_text(point, text, fontsize=fontsize, fontname=fontname, color=color, fill=fill)
+        self.operacoes += 1
+
+    def commit(self):
+        # Um único trecho de content stream para todas as operações acumuladas
+        if self.operacoes:
+            self.shape.commit()
+            self.shape = self.page.new_shape()
+            self.operacoes = 0
+# === FIM DESENHO EM LOTE ===
+
+# === INÍCIO PERFIL DE LAYOUT ===
+# As coordenadas de cada modelo PDF ficam em perfis_layout.json (um perfil por modelo, com herança).
+# O perfil é compilado uma vez por processo em tabelas de posições absolutas; o desenho só as indexa.
+ARQUIVO_PERFIS_LAYOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfis_layout.json")
+PERFIL_LAYOUT_PADRAO = "model2.pdf"  # usado quando o modelo não tem perfil próprio
+def _mesclar_perfil(base, alteracoes):
+    """Cópia de 'base' com as chaves de 'alteracoes' (dicionários aninhados são mesclados)."""
+    mesclado = dict(base)
+    for chave, valor in alteracoes.items():
+        if isinstance(valor, dict) and isinstance(mesclado.get(chave), dict):
+            mesclado[chave] = _mesclar_perfil(mesclado[chave], valor)
+        else:
+            mesclado[chave] = valor
+    return mesclado
+
+@functools.lru_cache(maxsize=None)
+def carregar_perfis_layout(caminho=ARQUIVO_PERFIS_LAYOUT):
+    """{nome do modelo: perfil} lidos do JSON, com a herança ('herda') já resolvida."""
+    with open(caminho, encoding='utf-8') as f:
+        brutos = {nome: perfil for nome, perfil in json.load(f).items() if isinstance(perfil, dict)}
+
+    perfis = {}
+    def resolver(nome, cadeia):
+        if nome in cadeia:
+            raise ValueError(f"Herança circular nos perfis de layout: {' -> '.join(cadeia + (nome,))}")
+        if nome not in brutos:
+            raise ValueError(f"Perfil de layout '{nome}' não existe em {caminho}")
+        if nome not in perfis:
+            perfil = dict(brutos[nome])
+            pai = perfil.pop('herda', None)
+            perfis[nome] = _mesclar_perfil(resolver(pai, cadeia + (nome,)), perfil) if pai else perfil
+        return perfis[nome]
+
+    for nome in brutos:
+        resolver(nome, ())
+    return perfis
+
+class LayoutFolha:
+    """
+    Perfil de layout compilado: posição absoluta de cada texto e retângulo da folha.
+    As tabelas são montadas com NumPy uma única vez e guardadas como tuplas, indexadas direto no desenho.
+    """
+    def __init__(self, nome, perfil):
+        self.nome = nome
+        self.perfil = perfil
+
+        # Cabeçalho: (campo de dados_pdf, ((x, y) de cada linha, ...), tamanho da fonte)
+        self.cabecalho = tuple((campo, tuple((c['x'], y) for y in (c['y'] if isinstance(c['y'], list) else [c['y']])),
+                                c['fonte'])
+                               for campo, c in perfil['cabecalho'].items())
+
+        # Grade horária: y de cada linha (Seg..Sab) e x de cada coluna, por turno
+        grade = perfil['grade']
+        self.y_grade = tuple((grade['y_inicio'] + np.cumsum([0] + grade['espacamentos'])).tolist())
+        self.x_grade = {turno: tuple((t['x'] + np.cumsum([0] + t['larguras'])).tolist())
+                        for turno, t in grade['turnos'].items()}
+        self.fonte_grade = grade['fonte']
+
+        obs = perfil['observacoes']
+        self.y_obs = self.y_grade[-1] + obs['distancia']
+        self.x_obs = tuple(obs['x'])
+        self.fonte_obs = obs['fonte']
+
+        # Quadro de frequência
+        freq = perfil['frequencia']
+        self.posicao_titulo = (freq['titulo']['x'], self.y_obs + freq['titulo']['distancia'])
+        self.fonte_titulo = freq['titulo']['fonte']
+        self.y_quadro = self.y_obs + freq['distancia_quadro']
+        self.altura_linha = freq['altura_linha']
+        self.x_dias = freq['dias']['x']
+        self.fonte_dias = freq['dias']['fonte']
+        self.margem_inferior = freq['margem_inferior']
+        self.y_inicio_nova_pagina = freq['y_inicio_nova_pagina']
+        self.altura_retangulo = freq['altura_retangulo']
+        tarja = freq['tarja']
+        self.tarja = (tarja['x_inicio'], tarja['x_fim'], tarja['altura'])
+
+        # Início e fim (x) de cada uma das 16 aulas do dia: o bit i da máscara ocupa x_inicio_aula[i]..x_fim_aula[i]
+        x_inicio = np.zeros(SLOTS_DIA)
+        x_fim = np.zeros(SLOTS_DIA)
+        for turno, (primeiro_bit, aulas) in TURNOS.items():
+            t = freq['turnos'][turno]
+            bordas = np.arange(aulas + 1) * t['largura_aula'] + t['x']
+            x_inicio[primeiro_bit:primeiro_bit + aulas] = bordas[:-1]
+            x_fim[primeiro_bit:primeiro_bit + aulas] = bordas[1:]
+        self.x_inicio_aula = tuple(x_inicio.tolist())
+        self.x_fim_aula = tuple(x_fim.tolist())
+
+        self._planos = {}
+
+    def plano_paginas(self, num_linhas, altura_pagina):
+        """
+        Paginação do quadro de frequência, decidida antes de qualquer desenho:
+        ((primeira linha, (y de cada linha na página, ...)), ...), uma entrada por página.
+        A primeira página começa em y_quadro e as seguintes em y_inicio_nova_pagina;
+        cada página recebe as linhas que cabem acima da margem inferior.
+        """
+        chave = (num_linhas, altura_pagina)
+        plano = self._planos.get(chave)
+        if plano is None:
+            limite = altura_pagina - self.margem_inferior
+            paginas = []
+            primeira, y_inicio = 0, self.y_quadro
+            while primeira < num_linhas:
+                cabem = int((limite - y_inicio) // self.altura_linha) + 1
+                # A primeira página pode ficar sem linhas (quadro abaixo da margem); as demais levam ao menos uma
+                quantidade = min(max(cabem, 0 if not paginas else 1), num_linhas - primeira)
+                paginas.append((primeira, tuple((y_inicio + np.arange(quantidade) * self.altura_linha).tolist())))
+                primeira += quantidade
+                y_inicio = self.y_inicio_nova_pagina
+            plano = self._planos[chave] = tuple(paginas)
+        return plano
+
+    def hash(self):
+        """Hash do perfil resolvido: qualquer coordenada alterada invalida os PDFs já gerados."""
+        return hashlib.sha256(json.dumps(self.perfil, sort_keys=True).encode('utf-8')).hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def layout_compilado(nome_perfil):
+    perfis = carregar_perfis_layout()
+    if nome_perfil not in perfis:
+        raise ValueError(f"Perfil de layout '{nome_perfil}' não existe em {ARQUIVO_PERFIS_LAYOUT}")
+    return LayoutFolha(nome_perfil, perfis[nome_perfil])
+
+def perfil_do_modelo(modelo_path=None):
+    """Nome do perfil de um modelo: o próprio nome do arquivo, se houver perfil para ele, ou o padrão."""
+    nome = os.path.basename(modelo_path) if modelo_path else PERFIL_LAYOUT_PADRAO
+    return nome if nome in carregar_perfis_layout() else PERFIL_LAYOUT_PADRAO
+
+def layout_do_modelo(modelo_path=None):
+    return layout_compilado(perfil_do_modelo(modelo_path))
+# === FIM PERFIL DE LAYOUT ===
+
+def desenhar_turno(current_page, layout, y, mascara, turno):
+    """Retângulo contínuo da primeira à última aula do turno, nas posições do layout."""
+    intervalo = intervalo_turno(mascara, turno)
+    if intervalo:
+        primeiro_bit = TURNOS[turno][0]
+        primeiro, ultimo = intervalo
+        altura = layout.altura_retangulo
+        rect = fitz.Rect(layout.x_inicio_aula[primeiro_bit + primeiro], y - altura/2,
+                         layout.x_fim_aula[primeiro_bit + ultimo], y + altura/2)
         current_page.draw_rect(rect, color=(0.8, 0.8, 0.8), fill=(0.8, 0.8, 0.8))
 
-def destacar_domingo(page, y_freq):
-    # Coordenadas para a tarja (ajuste conforme layout)
-    x_inicio = 72
-    x_fim = 565
-    altura = ALTURA_RETANGULO_DOMINGO * 2  # Tarja mais alta que os retângulos individuais
+def destacar_domingo(page, layout, y_freq):
+    # Tarja da largura do quadro, mais alta que os retângulos individuais
+    x_inicio, x_fim, altura = layout.tarja
     rect = fitz.Rect(x_inicio, y_freq - altura/2, x_fim, y_freq + altura/2)
     page.draw_rect(rect, color=(0.8, 0.8, 0.8), fill=(0.8, 0.8, 0.8))
     # Inserir texto centralizado
@@ -203,113 +1031,139 @@ def destacar_domingo(page, y_freq):
     page.insert_text((x_texto, y_freq - 2), texto, fontsize=9, fontname="helv")
 
 # === INÍCIO FERIADOS ===
-# === INÍCIO FERIADOS ===
-def carregar_feriados(excel_path, ano_base, mes_base):
+# Calendário de feriados em três camadas, da menor para a maior prioridade:
+#   1) feriados nacionais de data fixa
+#   2) feriados móveis, calculados a partir da Páscoa (Carnaval, Sexta-feira Santa, Corpus Christi)
+#   3) feriados/emendas da unidade, lidos da aba 'feriados' (a descrição da aba prevalece)
+INCLUIR_FERIADOS_NACIONAIS = True
+
+FERIADOS_NACIONAIS_FIXOS = {
+    (1, 1): "Confraternização Universal",
+    (4, 21): "Tiradentes",
+    (5, 1): "Dia do Trabalho",
+    (9, 7): "Independência do Brasil",
+    (10, 12): "Nossa Senhora Aparecida",
+    (11, 2): "Finados",
+    (11, 15): "Proclamação da República",
+    (11, 20): "Consciência Negra",
+    (12, 25): "Natal",
+}
+
+# Deslocamento em dias a partir do Domingo de Páscoa
+FERIADOS_MOVEIS = (
+    (-48, "Carnaval"),
+    (-47, "Carnaval"),
+    (-2, "Sexta-feira Santa"),
+    (60, "Corpus Christi"),
+)
+
+def domingo_de_pascoa(ano):
+    """Domingo de Páscoa (calendário gregoriano, algoritmo de Meeus/Jones/Butcher)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+@functools.lru_cache(maxsize=None)
+def feriados_nacionais(ano, mes):
+    """Camadas 1 e 2 para o mês: {dia: descricao}. Memorizado por (ano, mes)."""
+    feriados = {dia: descricao for (m, dia), descricao in FERIADOS_NACIONAIS_FIXOS.items() if m == mes}
+    pascoa = domingo_de_pascoa(ano)
+    for deslocamento, descricao in FERIADOS_MOVEIS:
+        data = pascoa + timedelta(days=deslocamento)
+        if data.year == ano and data.month == mes:
+            feriados[data.day] = descricao
+    return feriados
+
+def _dia_do_feriado(valor):
+    """Dia do mês a partir da coluna A da aba 'feriados': número, data ou texto ('12', '12/10/2025')."""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    if hasattr(valor, 'day'):
+        return int(valor.day)
+    texto = str(valor).strip()
+    if '/' in texto or '-' in texto:
+        data = pd.to_datetime(texto, dayfirst=True, errors='coerce')
+        return None if pd.isna(data) else int(data.day)
+    digitos = ''.join(ch for ch in texto if ch.isdigit())
+    return int(digitos) if digitos else None
+
+def feriados_da_planilha(linhas_ab, num_dias):
     """
-    Versão robusta para ler a aba 'feriados' mesmo quando os cabeçalhos não coincidem.
-    - Lê sem assumir cabeçalho.
-    - Varre a partir da linha 11 (índice 10 no pandas, mas aqui usamos header=None e iteramos).
-    - Aceita 'Dia do Mês' como número inteiro ou célula datetime.
-    - Pega a descrição na segunda coluna (col B) mesmo se o cabeçalho estiver ausente ou diferente.
-    Retorna dicionário {dia_int: descricao}.
+    Camada 3: colunas A (dia) e B (descrição) da aba 'feriados', a partir da linha 11.
+    Linhas sem dia válido são ignoradas; duas linhas vazias seguidas encerram a tabela.
     """
-    try:
-        # lê a planilha inteira da aba 'feriados' sem cabeçalho
-        wb = load_workbook(excel_path, data_only=True)
-        if 'feriados' not in wb.sheetnames:
-            print("Aba 'feriados' não encontrada no arquivo.")
-            return {}
-        sheet = wb['feriados']
-
-        feriados_mes = {}
-        # iterar a partir da linha 11 (conforme você indicou: A10/B10 são rótulos, dados começam na 11)
-        start_row = 11
-        # determina número de dias do mês para validar
-        num_dias = calendar.monthrange(ano_base, mes_base)[1]
-
-        row = start_row
-        while True:
-            cell_a = sheet[f"A{row}"].value
-            cell_b = sheet[f"B{row}"].value
-
-            # se ambas células vazias e chegamos a algumas linhas vazias seguidas, encerrar
-            if (cell_a is None or (isinstance(cell_a, str) and str(cell_a).strip() == "")) and \
-               (cell_b is None or (isinstance(cell_b, str) and str(cell_b).strip() == "")):
-                # checar próximo; se várias linhas vazias, assume fim
-                # vamos encerrar quando encontrar 5 linhas vazias consecutivas para segurança
-                # (mas, para simplicidade, se linha atual vazia e próxima também vazia, encerramos)
-                next_a = sheet[f"A{row+1}"].value
-                next_b = sheet[f"B{row+1}"].value
-                if (next_a is None or (isinstance(next_a, str) and str(next_a).strip() == "")) and \
-                   (next_b is None or (isinstance(next_b, str) and str(next_b).strip() == "")):
-                    break
-                else:
-                    row += 1
-                    continue
-
-            # tentar extrair dia inteiro da coluna A
-            dia_int = None
-            if cell_a is None:
-                # nada na coluna A, pular linha
-                row += 1
-                continue
-            try:
-                # se for número (int/float)
-                if isinstance(cell_a, (int, float)):
-                    dia_int = int(cell_a)
-                # se for datetime
-                elif hasattr(cell_a, 'day'):
-                    dia_int = int(cell_a.day)
-                else:
-                    # tentar converter string que contenha número (ex: "12" ou " 12 ")
-                    s = str(cell_a).strip()
-                    # se string no formato dd/mm/aaaa -> extrair dia
-                    if '/' in s or '-' in s:
-                        try:
-                            dt = pd.to_datetime(s, dayfirst=True, errors='coerce')
-                            if not pd.isna(dt):
-                                dia_int = int(dt.day)
-                        except Exception:
-                            dia_int = None
-                    else:
-                        # extrair dígitos da string
-                        nums = ''.join(ch for ch in s if ch.isdigit())
-                        if nums != "":
-                            dia_int = int(nums)
-            except Exception:
-                dia_int = None
-
-            # obter descrição (coluna B)
-            descricao = ""
-            if cell_b is not None:
-                descricao = str(cell_b).strip()
-
-            # validar e armazenar
-            if dia_int is not None and 1 <= dia_int <= num_dias:
-                if descricao == "":
-                    # se descrição vazia, ainda armazena com valor genérico
-                    descricao = "FERIADO"
-                feriados_mes[dia_int] = descricao
-            else:
-                # se encontrarmos algo na coluna A que não foi interpretado como dia válido,
-                # vamos ignorar e continuar — pode ser uma linha de observação
-                pass
+    feriados = {}
+    vazias_seguidas = 0
+    for linha in linhas_ab:
+        cell_a, cell_b = (tuple(linha) + (None, None))[:2]
+        if all(v is None or str(v).strip() == "" for v in (cell_a, cell_b)):
+            vazias_seguidas += 1
+            if vazias_seguidas >= 2:
+                break
+            continue
+        vazias_seguidas = 0
+        if cell_a is None:
+            continue
+        try:
+            dia = _dia_do_feriado(cell_a)
+        except Exception:
+            dia = None
+        if dia is not None and 1 <= dia <= num_dias:
+            descricao = "" if cell_b is None else str(cell_b).strip()
+            feriados[dia] = descricao or "FERIADO"
+    return feriados
 
-            row += 1
+def carregar_feriados(excel_path, ano_base, mes_base, planilha=None):
+    """
+    Feriados do mês, {dia_int: descricao}, juntando as três camadas.
+    O resultado fica memorizado no snapshot da planilha: é calculado uma vez por (ano, mes)
+    e reaproveitado por todos os professores.
+    """
+    try:
+        planilha = obter_planilha(excel_path, planilha)
+    except Exception as e:
+        print(f"Erro ao carregar aba 'feriados': {e}")
+        planilha = None
 
-        return feriados_mes
+    chave = (ano_base, mes_base)
+    if planilha is not None and chave in planilha.feriados_calculados:
+        return planilha.feriados_calculados[chave]
 
-    except Exception as e:
-        print(f"Erro ao carregar aba 'feriados' (robusto): {e}")
-        return {}
+    feriados_mes = dict(feriados_nacionais(ano_base, mes_base)) if INCLUIR_FERIADOS_NACIONAIS else {}
+    if planilha is not None:
+        try:
+            if 'feriados' in planilha.sheetnames:
+                num_dias = calendar.monthrange(ano_base, mes_base)[1]
+                feriados_mes.update(feriados_da_planilha(planilha.linhas_feriados(), num_dias))
+            else:
+                print("Aba 'feriados' não encontrada no arquivo.")
+        except Exception as e:
+            print(f"Erro ao carregar aba 'feriados' (robusto): {e}")
+        planilha.feriados_calculados[chave] = feriados_mes
+    return feriados_mes
+
+def mascara_feriados(feriados_do_mes):
+    """Feriados como máscara de bits: bit (dia - 1) ligado para cada dia de feriado."""
+    mascara = 0
+    for dia in feriados_do_mes:
+        mascara |= 1 << (dia - 1)
+    return mascara
 # === FIM FERIADOS ===
 
 
-def destacar_feriado(page, y_freq, descricao):
+def destacar_feriado(page, layout, y_freq, descricao):
     """Destaca um feriado no PDF, semelhante à marcação de domingo"""
-    x_inicio = 72
-    x_fim = 565
-    altura = ALTURA_RETANGULO_DOMINGO * 2
+    x_inicio, x_fim, altura = layout.tarja
     rect = fitz.Rect(x_inicio, y_freq - altura/2, x_fim, y_freq + altura/2)
     page.draw_rect(rect, color=(0.8, 0.8, 0.8), fill=(0.8, 0.8, 0.8))
     texto = descricao.upper()
@@ -318,7 +1172,186 @@ def destacar_feriado(page, y_freq, descricao):
     page.insert_text((x_texto, y_freq - 2), texto, fontsize=8, fontname="helv")
 # === FIM FERIADOS ===
 
-def preencher_pdf(dados, modelo_path, saida_path, excel_path):
+# === INÍCIO AULAS REMOTAS ===
+# Disciplinas híbridas (A30:F35 da aba do professor) x períodos da aba CalendarioRemotas.
+# Os períodos ficam num índice ordenado por (escala, curso): cada dia é uma busca binária,
+# em vez de percorrer a aba inteira para cada professor, dia e turno.
+TEXTO_AULA_REMOTA = "AULA REMOTA"
+TAMANHO_FONTE_AULA_REMOTA = 6
+
+def _normalizar(texto):
+    """Minúsculas e sem acentos: 'Sáb' -> 'sab', 'Manhã' -> 'manha'."""
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(ch for ch in texto if not unicodedata.combining(ch))
+
+def _chave_remota(valor):
+    return _normalizar(valor) if valor is not None and str(valor).strip() else None
+
+def disciplinas_hibridas(linhas):
+    """
+    Linhas A30:F35 da aba -> [(escala, curso, dia_semana, turno), ...], só as marcadas 'Sim'.
+    dia_semana segue calendar.weekday (0 = segunda); curso None vale para qualquer curso da escala.
+    """
+    dias = {_normalizar(d): i for i, d in enumerate(DIAS_SEMANA_ABREV)}
+    hibridas = []
+    for linha in linhas:
+        disciplina, curso, escala, dia, periodo, hibrida = (list(linha) + [None] * COLUNAS_HIBRIDAS)[:COLUNAS_HIBRIDAS]
+        if hibrida is None or _normalizar(hibrida) != 'sim':
+            continue
+        idx_dia = dias.get(_normalizar(dia)[:3]) if dia is not None else None
+        turno = _normalizar(periodo) if periodo is not None else None
+        if idx_dia is None or turno not in TURNOS or _chave_remota(escala) is None:
+            print(f"Disciplina híbrida '{disciplina}' ignorada: dia, período ou escala inválido.")
+            continue
+        hibridas.append((_chave_remota(escala), _chave_remota(curso), idx_dia, turno))
+    return hibridas
+
+class IndiceRemotas:
+    """
+    Períodos remotos da aba CalendarioRemotas agrupados por (escala, curso). Em cada chave os
+    períodos são ordenados e fundidos em intervalos disjuntos (datas como ordinal), e remota()
+    responde com bisect em O(log n). A chave (escala, None) junta todos os cursos da escala.
+    """
+    def __init__(self, linhas):
+        periodos = {}
+        for linha in linhas:
+            escala, curso, inicio, fim = (list(linha) + [None] * COLUNAS_REMOTAS)[:COLUNAS_REMOTAS]
+            escala = _chave_remota(escala)
+            if escala is None or not hasattr(inicio, 'toordinal') or not hasattr(fim, 'toordinal'):
+                continue
+            if fim < inicio:
+                print(f"Período remoto ignorado em CalendarioRemotas: fim antes do início ({inicio:%d/%m/%Y}).")
+                continue
+            for chave in {(escala, _chave_remota(curso)), (escala, None)}:
+                periodos.setdefault(chave, []).append((inicio.toordinal(), fim.toordinal()))
+        self._indice = {chave: self._fundir(intervalos) for chave, intervalos in periodos.items()}
+
+    @staticmethod
+    def _fundir(intervalos):
+        inicios, fins = [], []
+        for inicio, fim in sorted(intervalos):
+            if fins and inicio <= fins[-1] + 1:
+                fins[-1] = max(fins[-1], fim)
+            else:
+                inicios.append(inicio)
+                fins.append(fim)
+        return inicios, fins
+
+    def remota(self, escala, curso, data):
+        """True se a data cai num período remoto da escala/curso."""
+        intervalos = self._indice.get((escala, curso))
+        if intervalos is None:
+            return False
+        inicios, fins = intervalos
+        dia = data.toordinal()
+        pos = bisect.bisect_right(inicios, dia) - 1
+        return pos >= 0 and dia <= fins[pos]
+
+def indice_remotas(planilha):
+    """Índice da aba CalendarioRemotas, montado uma única vez por snapshot da planilha."""
+    if planilha.remotas_indexadas is None:
+        linhas = planilha.linhas_calendario_remotas() if 'CalendarioRemotas' in planilha.sheetnames else []
+        planilha.remotas_indexadas = IndiceRemotas(linhas)
+    return planilha.remotas_indexadas
+
+def mascara_remotas(ano, mes, hibridas, indice):
+    """
+    Máscara booleana dias x 16 das aulas remotas do mês (o parâmetro 'remotas' de
+    matriz_frequencia): para cada disciplina híbrida, liga as aulas do turno nos dias
+    da semana correspondentes que caem num período remoto.
+    """
+    semana = dias_semana_do_mes(ano, mes)
+    remotas = np.zeros((len(semana), SLOTS_DIA), dtype=bool)
+    for escala, curso, idx_dia, turno in hibridas:
+        inicio, quantidade = TURNOS[turno]
+        for idx in np.flatnonzero(semana == idx_dia).tolist():
+            if indice.remota(escala, curso, date(ano, mes, idx + 1)):
+                remotas[idx, inicio:inicio + quantidade] = True
+    return remotas
+
+def marcar_aula_remota(current_page, layout, y, mascara_remota, turno):
+    """Escreve "AULA REMOTA" centralizado sobre as aulas remotas do turno."""
+    intervalo = intervalo_turno(mascara_remota, turno)
+    if intervalo:
+        primeiro_bit = TURNOS[turno][0]
+        primeiro, ultimo = intervalo
+        x_inicio = layout.x_inicio_aula[primeiro_bit + primeiro]
+        largura = layout.x_fim_aula[primeiro_bit + ultimo] - x_inicio
+        # Num turno de uma só aula a fonte diminui para o texto caber no retângulo
+        tamanho = min(TAMANHO_FONTE_AULA_REMOTA,
+                      TAMANHO_FONTE_AULA_REMOTA * largura / fitz.get_text_length(TEXTO_AULA_REMOTA, fontsize=TAMANHO_FONTE_AULA_REMOTA))
+        x_texto = x_inicio + (largura - fitz.get_text_length(TEXTO_AULA_REMOTA, fontsize=tamanho)) / 2
+        current_page.insert_text((x_texto, y + tamanho / 3), TEXTO_AULA_REMOTA, fontsize=tamanho, fontname="helv")
+# === FIM AULAS REMOTAS ===
+
+# === INÍCIO CAMADA DO MÊS ===
+# Camadas já desenhadas neste processo: (ano, mes, feriados, perfil de layout, tamanho da página) -> documento PDF
+_CAMADAS_MES = {}
+LIMITE_CAMADAS_MES = 24
+
+def desenhar_camada_do_mes(ano, mes, feriados_do_mes, layout, largura, altura):
+    """
+    Desenha, num PDF à parte, tudo o que é igual para todos os professores no mês:
+    label "FOLHA DE FREQUÊNCIA - MÊS/ANO", dias do mês com dia da semana, tarjas de domingo e de feriado.
+    Cada página da camada é carimbada (show_pdf_page) na página correspondente da folha.
+    """
+    folha_freq = montar_folha_frequencia1(ano, mes)
+    plano = layout.plano_paginas(len(folha_freq), altura)
+
+    camada = fitz.open()
+    # Todas as páginas antes dos pincéis: inserir uma página invalida os objetos de página já abertos
+    for _ in plano:
+        camada.new_page(width=largura, height=altura)
+    paginas = [PincelLote(pagina) for pagina in camada]
+    page = paginas[0]
+    #
+    #-------Imprimir label "Folha de Frequencia"
+    nome_mes_extenso = format_date(datetime(ano, mes, 1), "MMMM", locale="pt_BR").upper()
+    label_frequencia = f"FOLHA DE FREQUÊNCIA - {nome_mes_extenso}/{ano}"
+    page.insert_text(layout.posicao_titulo, label_frequencia, fontsize=layout.fonte_titulo, fontname="helv", fill=(0, 0, 0))
+    #
+    for current_page, (primeira, posicoes_y) in zip(paginas, plano):
+        linhas_pagina = list(zip(folha_freq[primeira:primeira + len(posicoes_y)], posicoes_y))
+        for linha, y_freq in linhas_pagina:
+            texto = f"{linha['Dia do Mês']}  {linha['Dia da Semana']}"   # Ex: "01 S"
+            current_page.insert_text((layout.x_dias, y_freq), texto, fontsize=layout.fonte_dias)
+
+        for linha, y_freq in linhas_pagina:
+            # === INÍCIO FERIADOS ===
+            # Verifica se o dia (inteiro) está entre os feriados carregados
+            dia_inteiro = int(linha['Dia do Mês'])
+            descricao_feriado = feriados_do_mes.get(dia_inteiro, "")
+            if descricao_feriado:
+                # Feriado no domingo: só a descrição do feriado, para os textos não se sobreporem
+                destacar_feriado(current_page, layout, y_freq, descricao_feriado)
+            # === FIM FERIADOS ===
+            elif linha['Dia da Semana'] == 'Dom':
+                destacar_domingo(current_page, layout, y_freq)
+
+    for pincel in paginas:
+        pincel.commit()
+    return camada
+
+def camada_do_mes(ano, mes, feriados_do_mes, layout, largura, altura):
+    """Camada do mês desenhada uma única vez por processo e reaproveitada em todas as folhas."""
+    chave = (ano, mes, tuple(sorted(feriados_do_mes.items())), layout.nome, largura, altura)
+    camada = _CAMADAS_MES.get(chave)
+    if camada is None:
+        if len(_CAMADAS_MES) >= LIMITE_CAMADAS_MES:
+            for antiga in _CAMADAS_MES.values():
+                antiga.close()
+            _CAMADAS_MES.clear()
+        camada = desenhar_camada_do_mes(ano, mes, feriados_do_mes, layout, largura, altura)
+        _CAMADAS_MES[chave] = camada
+    return camada
+# === FIM CAMADA DO MÊS ===
+
+def ler_dados_professor(dados, excel_path, planilha=None, ano=None, mes=None):
+    """
+    Lê o cabeçalho, a grade e as disciplinas híbridas das abas do professor e os feriados do mês.
+    Retorna (dados_pdf, (grade_manha, grade_tarde, grade_noite), feriados_do_mes, remotas) ou None;
+    remotas é a máscara dias x 16 das aulas remotas (None se o professor não tem disciplina híbrida).
+    """
     nome_abas = dados.get("Nome da Aba")
     if not nome_abas or not isinstance(nome_abas, str):
         print("Nenhuma aba indicada para leitura ou valor inválido.")
@@ -330,7 +1363,8 @@ def preencher_pdf(dados, modelo_path, saida_path, excel_path):
         return
 
     try:
-        abas_disponiveis = pd.ExcelFile(excel_path).sheet_names
+        planilha = obter_planilha(excel_path, planilha)
+        abas_disponiveis = planilha.sheetnames
     except Exception as e:
         print(f"Erro ao acessar o arquivo Excel: {e}")
         return
@@ -350,19 +1384,18 @@ def preencher_pdf(dados, modelo_path, saida_path, excel_path):
         "ObsNoite": ""
     }
 
-    grade_manha_final = []
-    grade_tarde_final = []
-    grade_noite_final = []
+    grades_abas = []  # (manhã, tarde, noite) de cada aba lida, juntas depois do laço
+    hibridas = []
 
     for aba in abas_solicitadas:
         if aba not in abas_disponiveis:
             print(f"Aba '{aba}' não existe no arquivo.")
             continue
         try:
-            df_aba = pd.read_excel(excel_path, sheet_name=aba, engine='openpyxl', header=11)
-            if df_aba.empty:
+            with MEDICOES.fase('cabecalho_aba'):
+                row = planilha.cabecalho_aba(aba)
+            if row is None:
                 continue
-            row = df_aba.iloc[0]
 
             dados_pdf["Regime"] = tratar_valor(row.get("Regime Juridico", ""))
             dados_pdf["Categoria"] = tratar_valor(row.get("Categoria", ""))
@@ -373,179 +1406,906 @@ def preencher_pdf(dados, modelo_path, saida_path, excel_path):
 
             for i in range(1, 7):
                 col = f"Disciplina{i}"
-                if col in df_aba.columns:
+                if col in row:
                     val = tratar_valor(row.get(col, ""))
                     dados_pdf["Disciplinas"].append(val)
 
-            g_manha, g_tarde, g_noite = extrair_grades(excel_path, aba)
-            grade_manha_final = g_manha
-            grade_tarde_final = g_tarde
-            grade_noite_final = g_noite
+            with MEDICOES.fase('grade'):
+                grades_abas.append(extrair_grades(excel_path, aba, planilha))
 
             dados_pdf["ObsManha"] = tratar_valor(row.get("Obs-Manha", ""))
             dados_pdf["ObsTarde"] = tratar_valor(row.get("Obs-Tarde", ""))
             dados_pdf["ObsNoite"] = tratar_valor(row.get("Obs-Noite", ""))
 
+            with MEDICOES.fase('remotas'):
+                hibridas.extend(disciplinas_hibridas(planilha.ler_aba_professor(aba)['hibridas']))
+
         except Exception as e:
             print(f"Erro ao ler aba '{aba}': {e}")
 
     # Carregar feriados (apenas uma vez por folha) - === INÍCIO FERIADOS ===
-    feriados_do_mes = carregar_feriados(excel_path, ANO_REFERENCIA, MES_REFERENCIA)
+    ano, mes = mes_referencia(ano, mes)
+    with MEDICOES.fase('feriados'):
+        feriados_do_mes = carregar_feriados(excel_path, ano, mes, planilha)
     # === FIM FERIADOS ===
 
-    doc = fitz.open(modelo_path)
-    page = doc[0]
+    remotas = None
+    if hibridas:
+        with MEDICOES.fase('remotas'):
+            remotas = mascara_remotas(ano, mes, hibridas, indice_remotas(planilha))
 
-    # Cabeçalho
-    page.insert_text((80, 135), dados_pdf["NomeProf"], fontsize=9)
-    page.insert_text((360, 135), dados_pdf["Matricula"], fontsize=8)
-    page.insert_text((460, 135), dados_pdf["Regime"], fontsize=8)
-    page.insert_text((540, 135), dados_pdf["Categoria"], fontsize=8)
-
-    disciplinas_texto = dados_pdf["Disciplinas"]
-    if disciplinas_texto:
-        metade = len(disciplinas_texto) // 2 + len(disciplinas_texto) % 2
-        linha1 = ", ".join(disciplinas_texto[:metade])
-        linha2 = ", ".join(disciplinas_texto[metade:])
-        page.insert_text((95, 140), linha1, fontsize=6)
-        page.insert_text((95, 146), linha2, fontsize=6)
-
-    page.insert_text((535, 145), dados_pdf["CargaHoraria"], fontsize=9)
-    page.insert_text((98, 154), dados_pdf["HoraAtividade"], fontsize=9)
-    page.insert_text((295, 154), dados_pdf["HAE-O"], fontsize=9)
-    page.insert_text((473, 154), dados_pdf["HAE-C"], fontsize=9)
+    with MEDICOES.fase('grade'):
+        grades = juntar_grades(grades_abas)
 
-    # Inserir as três grades lado a lado
-    for i in range(6):
-        if i + 1 > extra_line_start:
-            y_pos = y_start + (i * line_height_default) + ((i + 1 - extra_line_start) * (line_height_extra - line_height_default))
-        else:
-            y_pos = y_start + i * line_height_default
+    return dados_pdf, tuple(grades), feriados_do_mes, remotas
 
-        x_pos = x_base_manha
-        for j, val in enumerate(grade_manha_final[i]):
-            page.insert_text((x_pos, y_pos), val, fontsize=fontsize)
-            if j + 1 == extra_col_start_manha:
-                x_pos += col_width_extra_manha
-            else:
-                x_pos += col_width_default
+def desenhar_folha(doc, num_pagina, dados_pdf, grades, feriados_do_mes, remotas=None, ano=None, mes=None, layout=None):
+    """
+    Desenha a folha de um professor a partir da página num_pagina do documento (cópia do modelo).
+    Páginas extras, se o quadro de frequência não couber, são acrescentadas ao final do documento.
+    As posições vêm do layout compilado (padrão: perfil de PERFIL_LAYOUT_PADRAO).
+    """
+    ano, mes = mes_referencia(ano, mes)
+    layout = layout or layout_do_modelo()
+    largura, altura = doc[num_pagina].rect.width, doc[num_pagina].rect.height
+
+    # Páginas e posições do quadro de frequência decididas antes de desenhar (o mesmo plano da camada do mês).
+    # As páginas extras são criadas antes dos pincéis: inserir uma página invalida os objetos de página já abertos
+    plano = layout.plano_paginas(calendar.monthrange(ano, mes)[1], altura)
+    primeira_extra = len(doc)
+    for _ in range(len(plano) - 1):
+        doc.new_page(width=largura, height=altura)
+    # Todos os textos e retângulos da folha são gravados de uma vez (ver PincelLote)
+    paginas = [PincelLote(doc[num_pagina])] + [PincelLote(doc[n]) for n in range(primeira_extra, len(doc))]
+    pincel = paginas[0]
 
-        x_pos = x_base_tarde
-        for j, val in enumerate(grade_tarde_final[i]):
-            page.insert_text((x_pos, y_pos), val, fontsize=fontsize)
-            if j + 1 >= extra_col_start_tarde:
-                x_pos += col_width_extra_tarde
-            else:
-                x_pos += col_width_default
+    # Cabeçalho
+    for campo, posicoes, tamanho in layout.cabecalho:
+        valor = dados_pdf[campo]
+        if isinstance(valor, list):
+            # Disciplinas: metade em cada linha
+            if not valor:
+                continue
+            metade = len(valor) // 2 + len(valor) % 2
+            textos = (", ".join(valor[:metade]), ", ".join(valor[metade:]))
+        else:
+            textos = (valor,)
+        for posicao, texto in zip(posicoes, textos):
+            pincel.insert_text(posicao, texto, fontsize=tamanho)
 
-        x_pos = x_base_noite
-        for j, val in enumerate(grade_noite_final[i]):
-            page.insert_text((x_pos, y_pos), val, fontsize=fontsize)
-            if j + 1 >= extra_col_start_noite:
-                x_pos += col_width_extra_noite
-            else:
-                x_pos += col_width_default
+    # Inserir as três grades lado a lado
+    for i, y_pos in enumerate(layout.y_grade):
+        for turno, grade in zip(TURNOS, grades):
+            for x_pos, val in zip(layout.x_grade[turno], grade[i]):
+                pincel.insert_text((x_pos, y_pos), val, fontsize=layout.fonte_grade)
 
-    obs_y = y_pos + obs_y_offset
-    page.insert_text((55, obs_y), dados_pdf["ObsManha"], fontsize=8)
-    page.insert_text((245, obs_y), dados_pdf["ObsTarde"], fontsize=8)
-    page.insert_text((435, obs_y), dados_pdf["ObsNoite"], fontsize=8)
+    for x_obs, campo in zip(layout.x_obs, ("ObsManha", "ObsTarde", "ObsNoite")):
+        pincel.insert_text((x_obs, layout.y_obs), dados_pdf[campo], fontsize=layout.fonte_obs)
+    #
+    # Tudo o que depende só do mês (dias, domingos, feriados e o label) vem pronto da camada do mês
+    camada = camada_do_mes(ano, mes, feriados_do_mes, layout, largura, altura)
     #
     # Inserir folha de frequência abaixo das observações
-    folha_freq = montar_folha_frequencia1(ANO_REFERENCIA, MES_REFERENCIA)
-    freq_y_start = obs_y + 50  # Posição inicial da folha no PDF
-    # 
-    #-------Imprimir label "Folha de Frequencia"
-    nome_mes_extenso = format_date(datetime(ANO_REFERENCIA, MES_REFERENCIA, 1), "MMMM", locale="pt_BR").upper()
-    label_frequencia = f"FOLHA DE FREQUÊNCIA - {nome_mes_extenso}/{ANO_REFERENCIA}"
-
-    label_y = obs_y + 18  # posição do label acima do quadro
-    page.insert_text((200, label_y), label_frequencia, fontsize=12, fontname="helv", fill=(0, 0, 0))
-    # 
-    for idx, linha in enumerate(folha_freq):
-        # Lógica para controle fino do espaçamento vertical entre linhas
-        if idx >= extra_freq_start:
-            y_freq = freq_y_start + (idx * freq_line_height_default) + \
-                    ((idx - extra_freq_start + 1) * (freq_line_height_extra - freq_line_height_default))
-        else:
-            y_freq = freq_y_start + idx * freq_line_height_default
-
-        texto = f"{linha['Dia do Mês']}  {linha['Dia da Semana']}"   # Ex: "01 S"
-        page.insert_text((36, y_freq), texto, fontsize=9)
-    # 
-    # Inserir folha de frequência
-    mapa_grade = mapear_grade_para_dias(grade_manha_final, grade_tarde_final, grade_noite_final)
-    folha_freq = montar_folha_frequencia(ANO_REFERENCIA, MES_REFERENCIA, mapa_grade)
-
-    freq_y_start = obs_y + 50
-    current_page = page
-
-    for idx, linha in enumerate(folha_freq):
-        
-        # Lógica para controle fino do espaçamento vertical entre linhas (recalcula y a cada iteração)
-        if idx >= extra_freq_start:
-            y_freq = freq_y_start + (idx * freq_line_height_default) + \
-                    ((idx - extra_freq_start + 1) * (freq_line_height_extra - freq_line_height_default))
+    mapa_grade = mapear_grade_para_dias(*grades)
+    folha_freq = montar_folha_frequencia(ano, mes, mapa_grade, feriados_do_mes, remotas)
+
+    for current_page, (primeira, posicoes_y) in zip(paginas, plano):
+        for linha, y_freq in zip(folha_freq[primeira:primeira + len(posicoes_y)], posicoes_y):
+            # Desenhar retângulos de frequência
+            if not linha.mascara:
+                continue
+            for turno in TURNOS:
+                desenhar_turno(current_page, layout, y_freq, linha.mascara, turno)
+            if linha.remotas:
+                for turno in TURNOS:
+                    marcar_aula_remota(current_page, layout, y_freq, linha.remotas, turno)
+
+    # A camada vai por cima dos retângulos: as tarjas têm a mesma cor e os textos
+    # "D O M I N G O"/feriado continuam legíveis mesmo sobre a aula do dia vizinho
+    for pagina_camada, pincel in enumerate(paginas):
+        pincel.commit()
+        pincel.page.show_pdf_page(pincel.rect, camada, pagina_camada)
+
+# === INÍCIO LOJA DE PDFs ===
+# PDFs já desenhados, guardados pelo hash das entradas normalizadas da folha. Um acerto devolve os
+# bytes guardados sem abrir o PyMuPDF. Desligada (None) até configurar_loja(): o main, o daemon e a
+# aplicação WSGI ligam; o verificar_golden.py e o benchmark continuam desenhando sempre.
+LOJA_PDF = None
+PASTA_LOJA_PDF = ".loja_pdf"             # dentro da pasta de saída
+LIMITE_LOJA_PDF_MB = 500                 # acima disso, as folhas usadas há mais tempo são removidas (LRU)
+ARQUIVO_ESTATISTICAS_LOJA = "estatisticas.json"
+INTERVALO_ESTATISTICAS_LOJA = 60         # segundos entre gravações de estatisticas.json nos servidores
+
+class LojaPdf:
+    """
+    Loja endereçada por conteúdo: <diretorio>/<2 primeiros dígitos>/<chave>.pdf.
+    A data de modificação do arquivo marca o último uso; quando o total passa de limite_bytes,
+    os arquivos usados há mais tempo são removidos. Acertos, falhas e bytes servidos são
+    contados em memória e acumulados em estatisticas.json por gravar_estatisticas().
+    """
+    def __init__(self, diretorio, limite_bytes=LIMITE_LOJA_PDF_MB * 1024 * 1024):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._tamanho = None  # total em disco, medido na primeira gravação
+        self._estatisticas_gravadas_em = time.monotonic()
+        self.zerar_contadores()
+
+    def zerar_contadores(self):
+        self.contadores = {'acertos': 0, 'falhas': 0, 'bytes_economizados': 0, 'removidas': 0}
+
+    def retirar_contadores(self):
+        """Devolve e zera os contadores (processos filhos devolvem os seus junto com o resultado)."""
+        contadores = self.contadores
+        self.zerar_contadores()
+        return contadores
+
+    def incorporar(self, contadores):
+        for nome, valor in contadores.items():
+            self.contadores[nome] += valor
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], f"{chave}.pdf")
+
+    def obter(self, chave):
+        """Bytes do PDF guardado para a chave, ou None."""
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+            os.utime(caminho)  # último uso, para a remoção LRU
+        except OSError:
+            self.contadores['falhas'] += 1
+            return None
+        self.contadores['acertos'] += 1
+        self.contadores['bytes_economizados'] += len(conteudo)
+        return conteudo
+
+    def guardar(self, chave, conteudo):
+        caminho = self.caminho(chave)
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'wb') as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            print(f"Não foi possível guardar o PDF na loja: {e}")
+            return
+        if self._tamanho is None:
+            self._tamanho = sum(tamanho for _, tamanho, _ in self._arquivos())
         else:
-            y_freq = freq_y_start + idx * freq_line_height_default
-
-        # Se necessário criar nova página (quebra)
-        if y_freq > current_page.rect.height - 50:
-            current_page = doc.new_page()
-            freq_y_start = 50
-            if idx >= extra_freq_start:
-                y_freq = freq_y_start + (idx * freq_line_height_default) + \
-                        ((idx - extra_freq_start + 1) * (freq_line_height_extra - freq_line_height_default))
+            self._tamanho += len(conteudo)
+        if self._tamanho > self.limite_bytes:
+            self.podar()
+
+    def _arquivos(self):
+        """[(caminho, tamanho, último uso), ...] de todos os PDFs da loja."""
+        arquivos = []
+        if os.path.isdir(self.diretorio):
+            for pasta, _, nomes in os.walk(self.diretorio):
+                for nome in nomes:
+                    if nome.endswith('.pdf'):
+                        caminho = os.path.join(pasta, nome)
+                        try:
+                            info = os.stat(caminho)
+                        except OSError:
+                            continue  # removido por outro processo
+                        arquivos.append((caminho, info.st_size, info.st_mtime))
+        return arquivos
+
+    def podar(self):
+        """Remove os PDFs usados há mais tempo até o total caber no limite."""
+        arquivos = sorted(self._arquivos(), key=lambda a: a[2])
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for caminho, tamanho, _ in arquivos:
+            if total <= self.limite_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            self.contadores['removidas'] += 1
+        self._tamanho = total
+
+    def gravar_estatisticas_periodicamente(self, intervalo=INTERVALO_ESTATISTICAS_LOJA):
+        """Para processos de longa duração: grava as estatísticas no máximo uma vez a cada 'intervalo' segundos."""
+        if time.monotonic() - self._estatisticas_gravadas_em >= intervalo:
+            self.gravar_estatisticas()
+
+    def gravar_estatisticas(self):
+        """Soma os contadores desta execução aos de estatisticas.json (gravação atômica) e os zera."""
+        caminho = os.path.join(self.diretorio, ARQUIVO_ESTATISTICAS_LOJA)
+        acumulado = self.ler_estatisticas()
+        for nome, valor in self.retirar_contadores().items():
+            acumulado[nome] = acumulado.get(nome, 0) + valor
+        acumulado['atualizado_em'] = datetime.now().isoformat(timespec='seconds')
+        self._estatisticas_gravadas_em = time.monotonic()
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(acumulado, f, indent=1, sort_keys=True)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            print(f"Não foi possível gravar as estatísticas da loja: {e}")
+        return acumulado
+
+    def ler_estatisticas(self):
+        caminho = os.path.join(self.diretorio, ARQUIVO_ESTATISTICAS_LOJA)
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def resumo(self):
+        """Linhas de texto com o conteúdo da loja e as estatísticas acumuladas."""
+        estatisticas = self.ler_estatisticas()
+        arquivos = self._arquivos()
+        acertos, falhas = estatisticas.get('acertos', 0), estatisticas.get('falhas', 0)
+        taxa = f"{acertos / (acertos + falhas):.1%}" if acertos + falhas else "-"
+        mb = 1024 * 1024
+        return [
+            f"Loja de PDFs: {self.diretorio}",
+            f"  Folhas guardadas: {len(arquivos)} ({sum(a[1] for a in arquivos) / mb:.1f} MB de {self.limite_bytes / mb:.0f} MB)",
+            f"  Acertos: {acertos} | falhas: {falhas} | taxa de acerto: {taxa}",
+            f"  Bytes economizados (servidos da loja): {estatisticas.get('bytes_economizados', 0) / mb:.1f} MB",
+            f"  Removidas pelo limite de tamanho: {estatisticas.get('removidas', 0)}",
+            f"  Atualizado em: {estatisticas.get('atualizado_em', '-')}",
+        ]
+
+def configurar_loja(diretorio, limite_mb=LIMITE_LOJA_PDF_MB):
+    """Liga a loja de PDFs neste processo (diretorio None desliga)."""
+    global LOJA_PDF
+    LOJA_PDF = LojaPdf(diretorio, int(limite_mb * 1024 * 1024)) if diretorio else None
+    return LOJA_PDF
+
+def chave_folha(lidos, modelo_path, ano, mes):
+    """
+    Hash das entradas normalizadas que determinam o PDF: cabeçalho, grade (texto das células,
+    de onde sai a máscara de bits), feriados, máscara de aulas remotas, mês, modelo e perfil de layout.
+    """
+    dados_pdf, grades, feriados_do_mes, remotas = lidos
+    entradas = {
+        'versao': VERSAO_RENDERIZACAO,
+        'ano_mes': [ano, mes],
+        'cabecalho': dados_pdf,
+        'grades': grades,
+        'feriados': sorted(feriados_do_mes.items()),
+        'remotas': None if remotas is None else np.packbits(remotas).tobytes().hex(),
+        'modelo': hash_do_modelo(modelo_path),
+        'layout': layout_do_modelo(modelo_path).hash(),
+    }
+    return hashlib.sha256(json.dumps(entradas, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+# === FIM LOJA DE PDFs ===
+
+def desenhar_documento(lidos, modelo_path, ano=None, mes=None):
+    """Documento PyMuPDF (em memória) com a folha desenhada a partir dos dados de ler_dados_professor."""
+    with MEDICOES.fase('renderizacao'):
+        doc = abrir_modelo(modelo_path)
+        desenhar_folha(doc, 0, *lidos, ano=ano, mes=mes, layout=layout_do_modelo(modelo_path))
+    return doc
+
+def caminho_temporario(caminho):
+    """Arquivo ao lado de 'caminho' para gravar antes do os.replace (um PDF pela metade nunca fica com o nome final)."""
+    return f"{caminho}.{os.getpid()}.tmp"
+
+def preencher_pdf(dados, modelo_path, saida_path, excel_path, planilha=None, ano=None, mes=None, forcar=False):
+    lidos = ler_dados_professor(dados, excel_path, planilha, ano, mes)
+    if lidos is None:
+        return
+
+    chave = None
+    conteudo = None
+    if LOJA_PDF is not None:
+        chave = chave_folha(lidos, modelo_path, *mes_referencia(ano, mes))
+        # forcar: desenha de novo mesmo com a folha na loja (e substitui a guardada)
+        conteudo = None if forcar else LOJA_PDF.obter(chave)
+
+    doc = desenhar_documento(lidos, modelo_path, ano, mes) if conteudo is None else None
+    temporario = caminho_temporario(saida_path)
+    with MEDICOES.fase('gravacao'):
+        try:
+            if doc is None:
+                with open(temporario, 'wb') as f:
+                    f.write(conteudo)
             else:
-                y_freq = freq_y_start + idx * freq_line_height_default
+                doc.save(temporario)
+                doc.close()
+                if chave is not None:
+                    with open(temporario, 'rb') as f:
+                        LOJA_PDF.guardar(chave, f.read())
+            os.replace(temporario, saida_path)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    return True
+
+def pdf_em_memoria(dados, modelo_path, excel_path, planilha=None, ano=None, mes=None, forcar=False):
+    """Mesma folha de preencher_pdf, devolvida em bytes sem passar pelo disco (None em caso de falha)."""
+    lidos = ler_dados_professor(dados, excel_path, planilha, ano, mes)
+    if lidos is None:
+        return None
 
-        # Domingo
-        if linha['Dia da Semana'] == 'Dom':
-            destacar_domingo(current_page, y_freq)
+    chave = None
+    if LOJA_PDF is not None:
+        chave = chave_folha(lidos, modelo_path, *mes_referencia(ano, mes))
+        conteudo = None if forcar else LOJA_PDF.obter(chave)
+        if conteudo is not None:
+            return conteudo
+
+    doc = desenhar_documento(lidos, modelo_path, ano, mes)
+    # doc.tobytes() passa o PDF por um callback Python em milhares de pedaços (~20x mais lento que
+    # gravar em arquivo): grava num arquivo temporário e lê de volta
+    with MEDICOES.fase('gravacao'):
+        descritor, temporario = tempfile.mkstemp(suffix=".pdf")
+        os.close(descritor)
+        try:
+            doc.save(temporario)
+            doc.close()
+            with open(temporario, 'rb') as f:
+                conteudo = f.read()
+        finally:
+            os.remove(temporario)
+        if chave is not None:
+            LOJA_PDF.guardar(chave, conteudo)
+    return conteudo
+
+# === INÍCIO PDF COMBINADO ===
+TAMANHO_LOTE_COMBINADO = 50  # professores acumulados em memória antes de descarregar no disco
+
+def _descarregar_lote(doc, caminho_parcial):
+    """Grava o lote atual no arquivo parcial e reabre o documento a partir do disco."""
+    if doc.name == caminho_parcial:
+        doc.save(caminho_parcial, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+    else:
+        doc.save(caminho_parcial, garbage=3, deflate=True)
+    doc.close()
+    # reaberto do disco: o MuPDF só carrega os objetos sob demanda, a memória não cresce com o lote
+    return fitz.open(caminho_parcial)
 
-        # === INÍCIO FERIADOS ===
-        # Verifica se o dia (inteiro) está entre os feriados carregados
+def gerar_pdf_combinado(dicionario_dados, modelo_path, saida_path, excel_path, planilha,
+                        tamanho_lote=TAMANHO_LOTE_COMBINADO, ano=None, mes=None):
+    """
+    Gera um único PDF com as folhas de todos os professores e um marcador por professor.
+    As páginas do modelo são inseridas sempre do mesmo documento, então fontes e imagens
+    são copiadas uma vez por lote; a cada tamanho_lote professores o documento é descarregado
+    no disco (gravação incremental). Ao final, grava com garbage=4 (deduplicação) e deflate.
+    Retorna (gerados, falhas).
+    """
+    modelo = abrir_modelo(modelo_path)
+    layout = layout_do_modelo(modelo_path)
+    caminho_parcial = f"{saida_path}.parcial"
+    if os.path.exists(caminho_parcial):
+        os.remove(caminho_parcial)
+
+    doc = fitz.open()
+    marcadores = []
+    gerados = falhas = pendentes_no_lote = 0
+    for dados in dicionario_dados:
+        inicio = len(doc)
         try:
-            dia_inteiro = int(linha['Dia do Mês'])
-            if dia_inteiro in feriados_do_mes:
-                descricao_feriado = feriados_do_mes.get(dia_inteiro, "")
-                if descricao_feriado:
-                    destacar_feriado(current_page, y_freq, descricao_feriado)
-        except Exception:
-            pass
-        # === FIM FERIADOS ===
+            with MEDICOES.do_professor(chave_medicao(dados, ano, mes)):
+                lidos = ler_dados_professor(dados, excel_path, planilha, ano, mes)
+                if lidos is None:
+                    falhas += 1
+                    continue
+                with MEDICOES.fase('renderizacao'):
+                    doc.insert_pdf(modelo)
+                    desenhar_folha(doc, inicio, *lidos, ano=ano, mes=mes, layout=layout)
+        except Exception as e:
+            print(f"Erro ao gerar a folha de '{dados.get('NomeProf')}': {e}")
+            if len(doc) > inicio:
+                doc.delete_pages(inicio, len(doc) - 1)
+            falhas += 1
+            continue
+        marcadores.append([1, tratar_valor(dados.get("NomeProf", "")), inicio + 1])
+        gerados += 1
+        pendentes_no_lote += 1
+        print(f"Folha adicionada ao PDF combinado: {dados.get('NomeProf')} (página {inicio + 1})")
+        if pendentes_no_lote >= tamanho_lote:
+            with MEDICOES.fase('gravacao'):
+                doc = _descarregar_lote(doc, caminho_parcial)
+            pendentes_no_lote = 0
+
+    modelo.close()
+    with MEDICOES.fase('gravacao'):
+        if gerados:
+            doc.set_toc(marcadores)
+            doc.save(caminho_temporario(saida_path), garbage=4, deflate=True)
+            os.replace(caminho_temporario(saida_path), saida_path)
+        doc.close()
+    if os.path.exists(caminho_parcial):
+        os.remove(caminho_parcial)
+    return gerados, falhas
+# === FIM PDF COMBINADO ===
+
+# === INÍCIO ZIP EM FLUXO ===
+# Todas as folhas do mês num ZIP gerado em fluxo: professor -> bytes do PDF -> entrada do ZIP ->
+# pedaços de bytes (resposta HTTP ou arquivo). Só uma folha fica em memória por vez e os primeiros
+# bytes saem logo depois da primeira folha, sem pasta temporária.
+TAMANHO_PEDACO_ZIP = 64 * 1024
+NIVEL_COMPRESSAO_ZIP = 1  # o PDF já vem comprimido em parte; nível 1 reduz ~40% gastando poucos ms por folha
+
+class _SaidaZip:
+    """Destino sem seek para o zipfile: acumula o que foi escrito até retirar() (o zipfile usa data descriptors)."""
+    def __init__(self):
+        self.pedacos = []
+
+    def write(self, dados):
+        self.pedacos.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b"".join(self.pedacos)
+        self.pedacos = []
+        return dados
+
+def nome_arquivo_folha(dados, ano, mes):
+    return f"{str(dados['NomeProf']).replace(' ', '_')}_{ano}-{mes}.pdf"
+
+def folhas_em_bytes(dicionario_dados, modelo_path, excel_path, planilha, ano=None, mes=None, trava=None,
+                    forcar=False):
+    """
+    Gera (dados, nome do arquivo, bytes do PDF ou None, mensagens) professor a professor, via
+    pdf_em_memoria (e, portanto, pela loja de PDFs). 'trava' (opcional) é segurada só durante
+    o desenho de cada folha, para servidores com threads.
+    """
+    for dados in dicionario_dados:
+        mensagens = io.StringIO()
+        with (trava or contextlib.nullcontext()), contextlib.redirect_stdout(mensagens), \
+                MEDICOES.do_professor(chave_medicao(dados, ano, mes)):
+            try:
+                conteudo = pdf_em_memoria(dados, modelo_path, excel_path, planilha, ano, mes, forcar)
+            except Exception as e:
+                conteudo = None
+                print(f"Erro ao gerar a folha de '{dados.get('NomeProf')}': {e}")
+                print(traceback.format_exc(limit=3), end='')
+        yield dados, nome_arquivo_folha(dados, ano, mes), conteudo, mensagens.getvalue()
+
+def fluxo_zip(folhas, falhas=None):
+    """
+    Recebe (nome, bytes) e devolve os pedaços do ZIP à medida que cada entrada é comprimida.
+    Nomes repetidos ganham sufixo; folhas com bytes None entram em 'falhas' (lista, opcional)
+    e são listadas em LEIA-ME_falhas.txt no fim do arquivo.
+    """
+    saida = _SaidaZip()
+    falhas = [] if falhas is None else falhas
+    usados = set()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO_ZIP) as zf:
+        for nome, conteudo in folhas:
+            if conteudo is None:
+                falhas.append(nome)
+                continue
+            base, extensao = os.path.splitext(nome)
+            n = 1
+            while nome in usados:
+                n += 1
+                nome = f"{base}_{n}{extensao}"
+            usados.add(nome)
+            with zf.open(nome, "w") as entrada:
+                for inicio in range(0, len(conteudo), TAMANHO_PEDACO_ZIP):
+                    entrada.write(conteudo[inicio:inicio + TAMANHO_PEDACO_ZIP])
+                    pedaco = saida.retirar()
+                    if pedaco:
+                        yield pedaco
+            yield saida.retirar()
+        if falhas:
+            zf.writestr("LEIA-ME_falhas.txt", "Folhas não geradas (ver as mensagens do gerador):\n" + "\n".join(falhas) + "\n")
+    yield saida.retirar()
+
+def gravar_zip(dicionario_dados, modelo_path, saida_path, excel_path, planilha, ano=None, mes=None, forcar=False):
+    """
+    Grava o ZIP do mês em saida_path pelo mesmo fluxo da aplicação web (gravação atômica:
+    arquivo .parcial renomeado no fim). Retorna (gerados, falhas).
+    """
+    falhas = []
+    def folhas():
+        for dados, nome, conteudo, mensagens in folhas_em_bytes(dicionario_dados, modelo_path, excel_path,
+                                                               planilha, ano, mes, forcar=forcar):
+            print(mensagens, end='')
+            if conteudo is not None:
+                print(f"Folha adicionada ao ZIP: {nome}")
+            yield nome, conteudo
+
+    caminho_parcial = f"{saida_path}.parcial"
+    try:
+        with open(caminho_parcial, "wb") as f:
+            for pedaco in fluxo_zip(folhas(), falhas):
+                f.write(pedaco)
+        os.replace(caminho_parcial, saida_path)
+    finally:
+        if os.path.exists(caminho_parcial):
+            os.remove(caminho_parcial)
+    return len(dicionario_dados) - len(falhas), len(falhas)
+# === FIM ZIP EM FLUXO ===
+
+# === INÍCIO PROCESSAMENTO PARALELO ===
+# Estado de cada processo do pool (--jobs): snapshot da planilha e modelo, carregados uma única vez
+_ESTADO_WORKER = {}
+
+def gerar_folha_professor(dados, modelo_path, saida_path, excel_path, planilha, ano=None, mes=None, forcar=False):
+    """
+    Gera a folha de um professor capturando as mensagens, para que possam ser exibidas em ordem.
+    Uma falha é devolvida como (False, mensagens) em vez de interromper o lote.
+    """
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida), MEDICOES.do_professor(chave_medicao(dados, ano, mes)):
+        try:
+            sucesso = bool(preencher_pdf(dados, modelo_path, saida_path, excel_path, planilha, ano, mes, forcar))
+        except Exception as e:
+            sucesso = False
+            print(f"Erro ao gerar a folha de '{dados.get('NomeProf')}': {e}")
+            print(traceback.format_exc(limit=3), end='')
+    return sucesso, saida.getvalue()
+
+def _inicializar_worker(excel_path, estado_planilha, modelo_path, ano, mes, loja=None, forcar=False):
+    # Com fork, o filho herda as medições já feitas pelo processo principal
+    MEDICOES.limpar()
+    # (com fork, a loja do processo principal viria junto com os contadores já acumulados)
+    configurar_loja(*(loja or (None,)))
+    _ESTADO_WORKER['planilha'] = PlanilhaBase(excel_path, estado=estado_planilha)
+    _ESTADO_WORKER['excel_path'] = excel_path
+    _ESTADO_WORKER['modelo_path'] = modelo_path
+    _ESTADO_WORKER['ano_mes'] = (ano, mes)
+    _ESTADO_WORKER['forcar'] = forcar
+    bytes_modelo(modelo_path)
+
+def _gerar_no_worker(tarefa):
+    dados, saida_path = tarefa
+    sucesso, mensagens = gerar_folha_professor(dados, _ESTADO_WORKER['modelo_path'], saida_path,
+                                               _ESTADO_WORKER['excel_path'], _ESTADO_WORKER['planilha'],
+                                               *_ESTADO_WORKER['ano_mes'], _ESTADO_WORKER['forcar'])
+    # As medições de tempo e os contadores da loja do processo filho voltam junto com o resultado
+    contadores_loja = LOJA_PDF.retirar_contadores() if LOJA_PDF is not None else None
+    return sucesso, mensagens, MEDICOES.retirar(), contadores_loja
+
+def gerar_folhas(tarefas, modelo_path, excel_path, planilha, jobs=1, ano=None, mes=None, forcar=False):
+    """
+    Gera as folhas [(dados, saida_path), ...] em série (jobs=1) ou num pool de processos.
+    Os resultados (sucesso, mensagens) saem sempre na mesma ordem das tarefas. Se um processo do
+    pool morre (falta de memória, falha no MuPDF), as folhas que ainda não voltaram saem como falha.
+    Com forcar, todas são desenhadas de novo, sem consultar a loja de PDFs.
+    """
+    if jobs <= 1 or len(tarefas) <= 1:
+        for dados, saida_path in tarefas:
+            yield gerar_folha_professor(dados, modelo_path, saida_path, excel_path, planilha, ano, mes, forcar)
+        return
 
-        # Desenhar retângulos de frequência
-        desenhar_retangulo_continuo(current_page, 114, y_freq, linha['Frequência-Manhã'])
-        desenhar_retangulo_continuo(current_page, 298, y_freq, linha['Frequência-Tarde'])
-        desenhar_retangulo_continuo(current_page, 483, y_freq, linha['Frequência-Noite'], largura_unitaria=LARGURA_RETANGULO_NOITE, altura=ALTURA_RETANGULO)
+    abas = {aba.strip() for dados, _ in tarefas for aba in str(dados.get("Nome da Aba", "")).split(",")}
+    estado_planilha = planilha.estado(sorted(a for a in abas if a))
+    jobs = min(jobs, len(tarefas))
+    chunksize = max(1, len(tarefas) // (jobs * 4))
+    loja = (LOJA_PDF.diretorio, LOJA_PDF.limite_bytes / (1024 * 1024)) if LOJA_PDF is not None else None
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_inicializar_worker,
+                             initargs=(excel_path, estado_planilha, modelo_path, ano, mes, loja, forcar)) as pool:
+        concluidas = 0
+        try:
+            for sucesso, mensagens, medicoes, contadores_loja in pool.map(_gerar_no_worker, tarefas, chunksize=chunksize):
+                MEDICOES.incorporar(medicoes)
+                if contadores_loja:
+                    LOJA_PDF.incorporar(contadores_loja)
+                concluidas += 1
+                yield sucesso, mensagens
+        except BrokenProcessPool as e:
+            for dados, _ in tarefas[concluidas:]:
+                yield False, (f"Erro ao gerar a folha de '{dados.get('NomeProf')}': processo do pool "
+                              f"encerrado antes de devolvê-la ({e})\n")
+# === FIM PROCESSAMENTO PARALELO ===
+
+# === INÍCIO REGERAÇÃO INCREMENTAL ===
+ARQUIVO_MANIFESTO = ".manifesto.json"  # gravado dentro da pasta de saída
+VERSAO_RENDERIZACAO = 9  # incrementar quando a lógica de desenho do PDF mudar
+
+def hash_layout(modelo_path):
+    """Hash do perfil de layout usado com o modelo, da versão de renderização e das opções que mudam o desenho."""
+    layout = layout_do_modelo(modelo_path)
+    valores = {'perfil': layout.nome, 'layout': layout.hash(), 'VERSAO_RENDERIZACAO': VERSAO_RENDERIZACAO,
+               'INCLUIR_FERIADOS_NACIONAIS': INCLUIR_FERIADOS_NACIONAIS}
+    return hashlib.sha256(json.dumps(valores, sort_keys=True).encode('utf-8')).hexdigest()
+
+def carregar_manifesto(output_dir):
+    caminho = os.path.join(output_dir, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Manifesto ignorado ({e}); todos os PDFs serão gerados.")
+        return {}
 
-    doc.save(saida_path)
-    doc.close()
+def gravar_manifesto(output_dir, manifesto):
+    caminho = os.path.join(output_dir, ARQUIVO_MANIFESTO)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporario, caminho)
+
+# Diário da execução: uma linha JSON por folha concluída (nome, entradas, SHA-256 do PDF), gravada
+# e sincronizada logo após a folha. Uma execução interrompida deixa o diário para trás; com --resume,
+# as folhas registradas são puladas se o PDF ainda existe com o mesmo hash e as entradas não mudaram.
+# O diário é apagado quando a execução termina (o manifesto passa a valer).
+ARQUIVO_DIARIO = ".diario_{ano}-{mes}.jsonl"  # gravado dentro da pasta de saída
+
+class DiarioExecucao:
+    """Diário de uma execução (ano, mes) na pasta de saída: lê o anterior com retomar=True, senão começa vazio."""
+    def __init__(self, output_dir, ano, mes, retomar=False):
+        self.caminho = os.path.join(output_dir, ARQUIVO_DIARIO.format(ano=ano, mes=mes))
+        self.concluidas = self.ler() if retomar else {}
+        if retomar:
+            self.descartar_linha_cortada()
+        # Sem --resume, o diário de uma execução anterior é descartado
+        self.arquivo = open(self.caminho, 'a' if retomar else 'w', encoding='utf-8')
+
+    def descartar_linha_cortada(self):
+        """Corta o diário no último fim de linha, para o próximo registro não se juntar a uma linha pela metade."""
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, 'r+b') as f:
+            conteudo = f.read()
+            if conteudo and not conteudo.endswith(b"\n"):
+                f.truncate(conteudo.rfind(b"\n") + 1)
+
+    def ler(self):
+        """{nome do PDF: registro}; a última linha pode estar cortada pela interrupção e é ignorada."""
+        concluidas = {}
+        if not os.path.exists(self.caminho):
+            return concluidas
+        with open(self.caminho, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                    concluidas[registro['saida']] = registro
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return concluidas
+
+    def concluida(self, saida_pdf, entradas):
+        """Verdadeiro se a folha foi registrada com as mesmas entradas e o PDF ainda existe com o mesmo hash."""
+        registro = self.concluidas.get(os.path.basename(saida_pdf))
+        if registro is None or registro.get('entradas') != entradas or not os.path.exists(saida_pdf):
+            return False
+        return hash_arquivo(saida_pdf) == registro.get('sha256')
+
+    def registrar(self, saida_pdf, entradas):
+        registro = {'saida': os.path.basename(saida_pdf), 'sha256': hash_arquivo(saida_pdf), 'entradas': entradas,
+                    'em': datetime.now().isoformat(timespec='seconds')}
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False, sort_keys=True) + "\n")
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+
+    def encerrar(self):
+        """Execução completa: fecha e apaga o diário."""
+        self.arquivo.close()
+        os.remove(self.caminho)
+
+def entradas_da_folha(dados, planilha, hash_modelo, hash_layout_atual, ano, mes):
+    """Hashes de tudo o que determina o PDF de um professor."""
+    abas = [aba.strip() for aba in str(dados.get("Nome da Aba", "")).split(",") if aba.strip()]
+    identificacao = json.dumps({k: str(dados.get(k)) for k in ('Matricula', 'NomeProf', 'Nome da Aba')},
+                               sort_keys=True, ensure_ascii=False)
+    return {
+        'ano_mes': f"{ano}-{mes}",
+        'professor': hashlib.sha256(identificacao.encode('utf-8')).hexdigest(),
+        'abas': {aba: planilha.hash_aba(aba) for aba in abas},
+        'feriados': planilha.hash_aba('feriados'),
+        'remotas': planilha.hash_aba('CalendarioRemotas'),
+        'modelo': hash_modelo,
+        'layout': hash_layout_atual,
+    }
+# === FIM REGERAÇÃO INCREMENTAL ===
 
-def processamento_central():
-    resultado = inicializar_programa()
+def processamento_central(forcar=False, jobs=1, validar=False, combinado=None, relatorio=False,
+                          ano=None, mes=None, modelo=PERFIL_LAYOUT_PADRAO, zip_saida=None, retomar=False):
+    leituras_antes = CONTADOR_LEITURAS_PLANILHA
+    t_inicio = time.perf_counter()
+    resultado = inicializar_programa(ano=ano, mes=mes)
     if resultado is None:
         return
+    t_carga = time.perf_counter() - t_inicio
 
-    ano, mes, df_parametros, dicionario_dados = resultado
+    ano, mes, df_parametros, dicionario_dados, planilha = resultado
     print("Conteúdo extraído da planilha:")
     for item in dicionario_dados:
         print(item)
 
-    pdf_modelo = "model2.pdf"
+    pdf_modelo = modelo
+    print(f"Modelo: {pdf_modelo} | perfil de layout: {perfil_do_modelo(pdf_modelo)}")
+    if os.path.basename(pdf_modelo) not in carregar_perfis_layout():
+        print(f"Aviso: {pdf_modelo} não tem perfil próprio em {os.path.basename(ARQUIVO_PERFIS_LAYOUT)}; "
+              f"as coordenadas de {PERFIL_LAYOUT_PADRAO} podem não servir para ele.")
+    if validar and not validar_modelo(pdf_modelo):
+        planilha.fechar()
+        return
     output_dir = "formularios_preenchidos"
     os.makedirs(output_dir, exist_ok=True)
     excel_path = f"Base-folhaPonto-{ano}-{mes}.xlsx"
 
+    if relatorio:
+        relatorio_aulas(dicionario_dados, excel_path, planilha, ano, mes,
+                        os.path.join(output_dir, f"aulas_{ano}-{mes}.csv"))
+
+    if combinado is not None:
+        # Um único PDF com todos os professores (sempre completo: não usa o manifesto nem --jobs)
+        saida_pdf = combinado or os.path.join(output_dir, f"Folhas_frequencia_{ano}-{mes}.pdf")
+        t_pdfs = time.perf_counter()
+        gerados, falhas = gerar_pdf_combinado(dicionario_dados, pdf_modelo, saida_pdf, excel_path, planilha,
+                                              ano=ano, mes=mes)
+        t_pdfs = time.perf_counter() - t_pdfs
+        planilha.fechar()
+        print(planilha.relatorio_cache())
+        if gerados:
+            print(f"PDF combinado salvo em: {saida_pdf}")
+        print(f"Tempos: carga da planilha {t_carga:.2f}s ({CONTADOR_LEITURAS_PLANILHA - leituras_antes} leitura(s) do xlsx) | "
+              f"PDF combinado com {gerados} folha(s) {t_pdfs:.2f}s | {falhas} falha(s)")
+        return
+
+    if zip_saida is not None:
+        # Todas as folhas num ZIP, em fluxo (também sem manifesto e sem --jobs)
+        saida_zip = zip_saida or os.path.join(output_dir, f"Folhas_frequencia_{ano}-{mes}.zip")
+        t_pdfs = time.perf_counter()
+        gerados, falhas = gravar_zip(dicionario_dados, pdf_modelo, saida_zip, excel_path, planilha, ano=ano, mes=mes,
+                                     forcar=forcar)
+        t_pdfs = time.perf_counter() - t_pdfs
+        planilha.fechar()
+        print(planilha.relatorio_cache())
+        print(f"ZIP salvo em: {saida_zip}")
+        print(f"Tempos: carga da planilha {t_carga:.2f}s ({CONTADOR_LEITURAS_PLANILHA - leituras_antes} leitura(s) do xlsx) | "
+              f"ZIP com {gerados} folha(s) {t_pdfs:.2f}s | {falhas} falha(s)")
+        return
+
+    # Só regenera os PDFs cujas entradas mudaram desde a última execução (ou todos, com --force)
+    manifesto = carregar_manifesto(output_dir)
+    hash_modelo = hash_do_modelo(pdf_modelo)
+    hash_layout_atual = hash_layout(pdf_modelo)
+    gerados = mantidos = retomados = 0
+    diario = DiarioExecucao(output_dir, ano, mes, retomar)
+    if retomar:
+        print(f"Retomando: {len(diario.concluidas)} folha(s) registradas no diário {diario.caminho}")
+
+    t_pdfs = time.perf_counter()
+    pendentes = []
     for dados in dicionario_dados:
-        saida_pdf = os.path.join(output_dir, f"{dados['NomeProf'].replace(' ', '_')}_{ano}-{mes}.pdf")
-        preencher_pdf(dados, pdf_modelo, saida_pdf, excel_path)
-        print(f"Formulário preenchido salvo em: {saida_pdf}")
+        saida_pdf = os.path.join(output_dir, nome_arquivo_folha(dados, ano, mes))
+        nome_saida = os.path.basename(saida_pdf)
+        entradas = entradas_da_folha(dados, planilha, hash_modelo, hash_layout_atual, ano, mes)
+        if not forcar and os.path.exists(saida_pdf) and manifesto.get(nome_saida) == entradas:
+            mantidos += 1
+            print(f"Formulário sem alterações, mantido: {saida_pdf}")
+            continue
+        if retomar and diario.concluida(saida_pdf, entradas):
+            manifesto[nome_saida] = entradas
+            retomados += 1
+            print(f"Formulário já gerado na execução interrompida, mantido: {saida_pdf}")
+            continue
+        pendentes.append((dados, saida_pdf, entradas))
+
+    tarefas = [(dados, saida_pdf) for dados, saida_pdf, _ in pendentes]
+    resultados = gerar_folhas(tarefas, pdf_modelo, excel_path, planilha, jobs, ano, mes, forcar)
+    falhas = 0
+    for (dados, saida_pdf, entradas), (sucesso, mensagens) in zip(pendentes, resultados):
+        print(mensagens, end='')
+        if sucesso:
+            manifesto[os.path.basename(saida_pdf)] = entradas
+            diario.registrar(saida_pdf, entradas)
+            gerados += 1
+            print(f"Formulário preenchido salvo em: {saida_pdf}")
+        else:
+            falhas += 1
+    t_pdfs = time.perf_counter() - t_pdfs
+    gravar_manifesto(output_dir, manifesto)
+    diario.encerrar()
 
-def main():
+    planilha.fechar()
+    print(planilha.relatorio_cache())
+
+    print(f"Tempos: carga da planilha {t_carga:.2f}s ({CONTADOR_LEITURAS_PLANILHA - leituras_antes} leitura(s) do xlsx) | "
+          f"geração de {gerados} PDF(s) {t_pdfs:.2f}s ({jobs} processo(s)) | "
+          f"{mantidos} mantido(s) sem alteração | "
+          + (f"{retomados} retomado(s) do diário | " if retomar else "") + f"{falhas} falha(s)")
+
+def intervalo_meses(texto):
+    """'2025-08..2025-12' (ou só '2025-10') -> [(2025, 8), (2025, 9), ..., (2025, 12)]."""
+    try:
+        inicio, _, fim = texto.partition("..")
+        ano_ini, mes_ini = (int(p) for p in inicio.split("-"))
+        ano_fim, mes_fim = (int(p) for p in (fim or inicio).split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"intervalo de meses inválido: '{texto}' (use AAAA-MM..AAAA-MM)")
+    if not (1 <= mes_ini <= 12 and 1 <= mes_fim <= 12) or (ano_fim, mes_fim) < (ano_ini, mes_ini):
+        raise argparse.ArgumentTypeError(f"intervalo de meses inválido: '{texto}'")
+    meses = []
+    ano, mes = ano_ini, mes_ini
+    while (ano, mes) <= (ano_fim, mes_fim):
+        meses.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+def saida_do_mes(caminho, ano, mes, varios_meses):
+    """Com vários meses, 'saida.zip' vira 'saida_AAAA-M.zip' para um mês não sobrescrever o outro ('' = nome padrão)."""
+    if not caminho or not varios_meses:
+        return caminho
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}_{ano}-{mes}{extensao}"
+
+def ler_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as folhas de frequência dos professores.")
+    parser.add_argument("--meses", type=intervalo_meses, default=None, metavar="AAAA-MM..AAAA-MM",
+                        help="mês ou intervalo de meses a gerar no mesmo processo "
+                             f"(padrão: {ANO_REFERENCIA}-{MES_REFERENCIA:02d})")
+    parser.add_argument("--force", action="store_true",
+                        help="regera todos os PDFs, mesmo os que não tiveram alteração nas entradas, "
+                             "desenhando de novo em vez de copiar da loja de PDFs (a loja recebe as folhas novas)")
+    parser.add_argument("--resume", action="store_true",
+                        help="retoma uma execução interrompida: pula as folhas registradas no diário "
+                             "cujo PDF ainda existe com o mesmo hash")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="número de processos para gerar os PDFs em paralelo (padrão: 1)")
+    parser.add_argument("--validar-modelo", action="store_true",
+                        help="confere o número de páginas e o tamanho do modelo antes de gerar")
+    parser.add_argument("--modelo", default=PERFIL_LAYOUT_PADRAO, metavar="ARQUIVO",
+                        help="PDF modelo da folha; as coordenadas vêm do perfil de mesmo nome em "
+                             f"perfis_layout.json (padrão: {PERFIL_LAYOUT_PADRAO})")
+    parser.add_argument("--combined", nargs="?", const="", default=None, metavar="ARQUIVO",
+                        help="gera um único PDF com todos os professores e marcadores "
+                             "(padrão: formularios_preenchidos/Folhas_frequencia_AAAA-M.pdf; com --meses, "
+                             "um arquivo por mês: ARQUIVO_AAAA-M.pdf)")
+    parser.add_argument("--zip", nargs="?", const="", default=None, metavar="ARQUIVO",
+                        help="grava todas as folhas do mês num ZIP, uma a uma, sem pasta temporária "
+                             "(padrão: formularios_preenchidos/Folhas_frequencia_AAAA-M.zip; com --meses, "
+                             "um arquivo por mês: ARQUIVO_AAAA-M.zip)")
+    parser.add_argument("--relatorio-aulas", action="store_true",
+                        help="grava formularios_preenchidos/aulas_AAAA-M.csv com as aulas do mês por professor")
+    parser.add_argument("--relatorio-tempos", default=os.path.join("formularios_preenchidos", ARQUIVO_RELATORIO_TEMPOS),
+                        metavar="ARQUIVO",
+                        help="JSON com os tempos (parede e CPU) de cada fase, por professor e agregados "
+                             f"(padrão: formularios_preenchidos/{ARQUIVO_RELATORIO_TEMPOS})")
+    parser.add_argument("--loja", default=os.path.join("formularios_preenchidos", PASTA_LOJA_PDF), metavar="PASTA",
+                        help="loja de PDFs já desenhados, reaproveitados quando as entradas da folha não mudam "
+                             f"(padrão: formularios_preenchidos/{PASTA_LOJA_PDF})")
+    parser.add_argument("--sem-loja", action="store_true", help="desenha todas as folhas sem consultar a loja de PDFs")
+    parser.add_argument("--loja-limite-mb", type=float, default=LIMITE_LOJA_PDF_MB, metavar="MB",
+                        help=f"tamanho máximo da loja; as folhas usadas há mais tempo saem primeiro (padrão: {LIMITE_LOJA_PDF_MB})")
+    parser.add_argument("--loja-estatisticas", action="store_true",
+                        help="mostra o conteúdo da loja, a taxa de acerto e os bytes economizados, e sai")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    loja = configurar_loja(None if args.sem_loja else args.loja, args.loja_limite_mb)
+    if args.loja_estatisticas:
+        print("\n".join((loja or LojaPdf(args.loja, args.loja_limite_mb * 1024 * 1024)).resumo()))
+        return
+    MEDICOES.limpar()
     print("=== Iniciando processamento da folha de ponto ===")
-    processamento_central()
+    # Vários meses no mesmo processo: modelo, camadas do mês e abas já interpretadas são reaproveitados
+    meses = args.meses or [mes_referencia()]
+    for ano, mes in meses:
+        if len(meses) > 1:
+            print(f"--- Mês {mes:02d}/{ano} ---")
+        processamento_central(forcar=args.force, jobs=args.jobs, validar=args.validar_modelo,
+                              combinado=saida_do_mes(args.combined, ano, mes, len(meses) > 1),
+                              relatorio=args.relatorio_aulas, ano=ano, mes=mes, modelo=args.modelo,
+                              zip_saida=saida_do_mes(args.zip, ano, mes, len(meses) > 1), retomar=args.resume)
+
+    try:
+        os.makedirs(os.path.dirname(args.relatorio_tempos) or ".", exist_ok=True)
+        dados_tempos = MEDICOES.gravar(args.relatorio_tempos)
+        print("\n".join(MEDICOES.resumo(dados_tempos)))
+        print(f"Relatório de tempos salvo em: {args.relatorio_tempos}")
+    except OSError as e:
+        print(f"Não foi possível gravar o relatório de tempos: {e}")
+    if loja is not None:
+        contadores = dict(loja.contadores)
+        loja.podar()
+        loja.gravar_estatisticas()
+        print(f"Loja de PDFs: {contadores['acertos']} acerto(s), {contadores['falhas']} falha(s), "
+              f"{contadores['bytes_economizados'] / 1024:.0f} KB servidos sem desenhar ({loja.diretorio})")
     print("=== Fim do processamento ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+# Gera planilhas Base-folhaPonto-AAAA-M.xlsx sintéticas, com o mesmo layout das planilhas reais:
+# aba 'parametros' com N professores, uma aba por professor (cabeçalho na linha 12/13, grade em
+# B19:Q24, disciplinas híbridas em A30:F35), aba 'feriados' e aba 'CalendarioRemotas'.
+#
+# Uso: python gerar_planilha_sintetica.py N [--ano 2025] [--mes 10] [--semente 1] [--saida arquivo.xlsx]
+
+import argparse
+import calendar
+import os
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+NOMES = ("Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Fernando", "Gabriela", "Henrique", "Isabela",
+         "João", "Karina", "Lucas", "Mariana", "Nelson", "Olívia", "Paulo", "Renata", "Sérgio", "Tânia", "Vítor")
+SOBRENOMES = ("Almeida", "Barbosa", "Cardoso", "Dias", "Esteves", "Ferreira", "Gomes", "Lima", "Moreira",
+              "Nogueira", "Oliveira", "Pereira", "Queiroz", "Ribeiro", "Santos", "Teixeira", "Veríssimo")
+DISCIPLINAS = ("Algoritmos", "Banco de dados I", "Banco de dados II", "Engenharia de Software",
+               "Laboratorio de Engenharia de Software", "Redes de Computadores", "Sistemas Operacionais",
+               "Testes de Software", "Programação Web", "Estatística", "Cálculo I", "Inglês Técnico")
+DIAS_GRADE = ("Segunda", "Terca", "Quarta", "Quinta", "Sexta", "sabado")
+DIAS_HIBRIDAS = ("Seg", "Ter", "Qua", "Qui", "Sex", "Sáb")
+PERIODOS = ("Manhã", "Tarde", "Noite")
+CURSOS = ("ADS", "GTI", "DSM")
+ESCALAS = ("Escala1", "Escala2", "Escala3")
+AULAS_POR_TURNO = (6, 6, 4)
+
+VAZIO = "----"
+PROBABILIDADE_AULA = 0.35     # chance de um turno de um dia ter aulas
+PROBABILIDADE_HIBRIDA = 0.2   # chance de uma disciplina híbrida estar marcada 'Sim'
+LINHAS_REMOTAS = 72           # períodos na aba CalendarioRemotas (linhas 8 a 79)
+
+
+def _linhas_vazias(ws, quantidade):
+    for _ in range(quantidade):
+        ws.append([])
+
+
+def grade_aleatoria(rnd):
+    """Seis linhas (Seg..Sab) de 16 células: blocos contínuos de 'x' por turno."""
+    linhas = []
+    for dia in DIAS_GRADE:
+        linha = [dia]
+        for aulas in AULAS_POR_TURNO:
+            turno = [VAZIO] * aulas
+            if rnd.random() < PROBABILIDADE_AULA:
+                primeira = rnd.randrange(aulas)
+                ultima = rnd.randrange(primeira, aulas)
+                turno[primeira:ultima + 1] = ["x"] * (ultima + 1 - primeira)
+            linha += turno
+        linhas.append(linha)
+    return linhas
+
+
+def escrever_aba_professor(ws, rnd, matricula, nome, aba):
+    disciplinas = rnd.sample(DISCIPLINAS, rnd.randint(1, 6))
+    _linhas_vazias(ws, 5)
+    ws.append(["Matrícula", aba])                                             # linha 6
+    ws.append(["Nome do Professor", nome])                                    # linha 7
+    _linhas_vazias(ws, 3)
+    ws.append([None] * 12 + ["Manha", "Tarde", "Manha"])                      # linha 11
+    ws.append(["Regime Juridico", "Carga Horária", "Categoria", "Hora Atividade", "HAE-O", "HAE-C"]
+              + [f"Disciplina{i}" for i in range(1, 7)] + ["Obs-Manha", "Obs-Tarde", "Obs-Noite"])
+    regime = rnd.choice(("CLT", "Estatutário"))
+    ws.append([regime, rnd.choice((8, 12, 18, 24, 40)), regime, rnd.choice((4, 8, 12)),
+               rnd.choice(("", "2h", "4h")), rnd.choice(("", "2h"))]
+              + disciplinas + [None] * (6 - len(disciplinas))
+              + [f"Observação manhã {matricula}", f"Observação tarde {matricula}", ""])  # linha 13
+    _linhas_vazias(ws, 2)
+    ws.append([None, "Grade Horária"])                                        # linha 16
+    ws.append([None, "Manha"] + [None] * 5 + ["Tarde"] + [None] * 5 + ["Noite"])
+    ws.append(["Aulas"] + [f"Manha-Aula{i}" for i in range(1, 7)] + [f"Tarde-Aula{i}" for i in range(1, 7)]
+              + [f"Noite-Aula{i}" for i in range(1, 5)])                     # linha 18
+    for linha in grade_aleatoria(rnd):                                        # linhas 19 a 24
+        ws.append(linha)
+    _linhas_vazias(ws, 4)
+    ws.append(["Disciplinas Híbridas do Professor", "Curso", "ID-Escala-Hibrida", "Dia da Semana ",
+               "Periodo", "Aula Hibrida (Sim/Nao)"])                         # linha 29
+    for disciplina in (disciplinas + [0] * 6)[:6]:                            # linhas 30 a 35
+        hibrida = "Sim" if disciplina and rnd.random() < PROBABILIDADE_HIBRIDA else "Não"
+        ws.append([disciplina, rnd.choice(CURSOS + (None,)), rnd.choice(ESCALAS),
+                   rnd.choice(DIAS_HIBRIDAS), rnd.choice(PERIODOS), hibrida])
+
+
+def escrever_parametros(ws, ano, mes, professores):
+    _linhas_vazias(ws, 4)
+    ws.append(["AnoBase", ano])                                               # linha 5
+    ws.append(["MesBase", mes])                                               # linha 6
+    _linhas_vazias(ws, 2)
+    ws.append([None, "Lista de Professores"])                                 # linha 9
+    _linhas_vazias(ws, 1)
+    ws.append(["Sequencia", "Matricula", "NomeProf", "Nome da Aba"])          # linha 11
+    for sequencia, (matricula, nome, aba) in enumerate(professores, start=1):
+        ws.append([sequencia, matricula, nome, aba])
+
+
+def escrever_feriados(ws, rnd, ano, mes):
+    _linhas_vazias(ws, 5)
+    ws.append(["AnoBase", ano])                                               # linha 6
+    ws.append(["MesBase", mes])
+    _linhas_vazias(ws, 1)
+    ws.append(["Tabela de feriado do Mês"])                                   # linha 9
+    ws.append(["Dia do Mês", "Descricao do Feriado"])                         # linha 10
+    num_dias = calendar.monthrange(ano, mes)[1]
+    for dia in sorted(rnd.sample(range(1, num_dias + 1), 3)):                 # a partir da linha 11
+        ws.append([dia, rnd.choice(("Feriado municipal", "Emenda de feriado", "Recesso escolar"))])
+
+
+def escrever_calendario_remotas(ws, rnd, ano, mes):
+    _linhas_vazias(ws, 4)
+    ws.append([None, None, "Remotas"])                                        # linha 5
+    _linhas_vazias(ws, 1)
+    ws.append(["id-Escala-hibrida", "id-curso-online", "Inicio-online", "Fim-online"])  # linha 7
+    inicio_mes = datetime(ano, mes, 1)
+    for _ in range(LINHAS_REMOTAS):                                           # linhas 8 a 79
+        inicio = inicio_mes + timedelta(days=rnd.randrange(-60, 60))
+        ws.append([rnd.choice(ESCALAS), rnd.choice(CURSOS), inicio, inicio + timedelta(days=rnd.randint(0, 6))])
+
+
+def gerar_planilha(caminho, num_professores, ano=2025, mes=10, semente=1):
+    """Grava a planilha sintética em 'caminho' e devolve a lista [(matricula, nome, aba), ...]."""
+    rnd = random.Random(semente)
+    professores = []
+    for i in range(1, num_professores + 1):
+        matricula = 1000000 + i
+        nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+        professores.append((matricula, nome, f"Prof{i}-{matricula}"))
+
+    # write_only: as linhas vão direto para o arquivo, sem manter as milhares de abas em memória
+    wb = Workbook(write_only=True)
+    escrever_parametros(wb.create_sheet("parametros"), ano, mes, professores)
+    escrever_feriados(wb.create_sheet("feriados"), rnd, ano, mes)
+    escrever_calendario_remotas(wb.create_sheet("CalendarioRemotas"), rnd, ano, mes)
+    for matricula, nome, aba in professores:
+        escrever_aba_professor(wb.create_sheet(aba), rnd, matricula, nome, aba)
+    wb.save(caminho)
+    return professores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma planilha Base-folhaPonto sintética.")
+    parser.add_argument("professores", type=int, help="número de professores (abas)")
+    parser.add_argument("--ano", type=int, default=2025)
+    parser.add_argument("--mes", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=1, help="semente do gerador aleatório (padrão: 1)")
+    parser.add_argument("--saida", default=None, help="arquivo de saída (padrão: Base-folhaPonto-AAAA-M.xlsx)")
+    parser.add_argument("--sobrescrever", action="store_true", help="substitui o arquivo de saída, se existir")
+    args = parser.parse_args()
+
+    saida = args.saida or f"Base-folhaPonto-{args.ano}-{args.mes}.xlsx"
+    if os.path.exists(saida) and not args.sobrescrever:
+        # Evita apagar por engano uma planilha real com o mesmo nome
+        print(f"Arquivo {saida} já existe; use --sobrescrever ou --saida.")
+        return
+    gerar_planilha(saida, args.professores, args.ano, args.mes, args.semente)
+    print(f"Planilha sintética com {args.professores} professor(es) salva em: {saida}")
+
+
+if __name__ == "__main__":
+    main()
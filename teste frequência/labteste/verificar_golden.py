@@ -0,0 +1,218 @@
+# Regressão visual da folha de frequência: gera as folhas de um corpus fixo de professores,
+# rasteriza cada página (PyMuPDF, DPI fixo, tons de cinza) e compara com as imagens de
+# referência em golden/ usando NumPy, dentro de uma tolerância; o texto extraído de cada
+# página também é comparado. Cada caminho de renderização (folha individual, PDF combinado
+# e, com --jobs, o pool de processos) é cronometrado e conferido contra as mesmas referências.
+#
+# Corpus: as duas planilhas de exemplo e uma planilha sintética (gerar_planilha_sintetica.py,
+# semente fixa) com disciplinas híbridas e aulas remotas.
+#
+# Uso: python verificar_golden.py              confere (código de saída 1 se algo mudou)
+#      python verificar_golden.py --atualizar  regrava as referências depois de uma mudança intencional
+#      python verificar_golden.py --jobs 2     também confere o caminho paralelo
+
+import argparse
+import contextlib
+import difflib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+import geradorFolhaPonto as gerador
+import gerar_planilha_sintetica
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+PASTA_GOLDEN = os.path.join(DIRETORIO, "golden")
+MODELO = os.path.join(DIRETORIO, "model2.pdf")
+
+DPI = 72
+TOLERANCIA_PIXEL = 32        # diferença de tom (0-255) abaixo da qual o pixel é considerado igual
+TOLERANCIA_FRACAO = 0.0002   # fração máxima de pixels diferentes por página (~100 pixels a 72 DPI)
+
+PROFESSORES_SINTETICOS = 6
+SEMENTE_SINTETICA = 7
+
+
+@contextlib.contextmanager
+def no_diretorio(caminho):
+    anterior = os.getcwd()
+    os.chdir(caminho)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+
+def montar_corpus(pasta_temporaria):
+    """[(caso, excel_path, ano, mes), ...] com as planilhas de exemplo e a sintética."""
+    corpus = [(f"amostra-{ano}-{mes}", os.path.join(DIRETORIO, f"Base-folhaPonto-{ano}-{mes}.xlsx"), ano, mes)
+              for ano, mes in ((2025, 9), (2025, 10))]
+    sintetica = os.path.join(pasta_temporaria, "Base-folhaPonto-2025-10.xlsx")
+    gerar_planilha_sintetica.gerar_planilha(sintetica, PROFESSORES_SINTETICOS, 2025, 10, SEMENTE_SINTETICA)
+    corpus.append(("sintetica-2025-10", sintetica, 2025, 10))
+    return corpus
+
+
+def ler_professores(excel_path, ano, mes):
+    """Snapshot da planilha (sem cache em disco, para não gravar nada ao lado dela) e lista de professores."""
+    planilha = gerador.PlanilhaBase(excel_path, usar_cache=False)
+    with no_diretorio(os.path.dirname(excel_path)), contextlib.redirect_stdout(io.StringIO()):
+        _, _, _, dicionario_dados, _ = gerador.inicializar_programa(planilha, ano, mes)
+    return planilha, dicionario_dados
+
+
+def nome_folha(dados):
+    return str(dados['NomeProf']).replace(' ', '_')
+
+
+def rasterizar(pagina):
+    """Página -> (matriz NumPy altura x largura em tons de cinza, texto extraído)."""
+    pix = pagina.get_pixmap(dpi=DPI, colorspace=fitz.csGRAY, alpha=False)
+    imagem = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    return imagem, pagina.get_text()
+
+
+def ler_golden(caminho_base):
+    pix = fitz.Pixmap(f"{caminho_base}.png")
+    imagem = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    with open(f"{caminho_base}.txt", encoding="utf-8") as f:
+        return imagem, f.read()
+
+
+def gravar_golden(caminho_base, pagina):
+    pagina.get_pixmap(dpi=DPI, colorspace=fitz.csGRAY, alpha=False).save(f"{caminho_base}.png")
+    with open(f"{caminho_base}.txt", "w", encoding="utf-8") as f:
+        f.write(pagina.get_text())
+
+
+def comparar_pagina(pagina, caminho_base):
+    """Lista de problemas (vazia se a página confere com a referência)."""
+    if not os.path.exists(f"{caminho_base}.png"):
+        return ["referência inexistente (rode com --atualizar)"]
+    imagem, texto = rasterizar(pagina)
+    esperada, texto_esperado = ler_golden(caminho_base)
+    problemas = []
+    if imagem.shape != esperada.shape:
+        problemas.append(f"tamanho {imagem.shape} diferente do esperado {esperada.shape}")
+    else:
+        diferentes = np.abs(imagem.astype(np.int16) - esperada) > TOLERANCIA_PIXEL
+        fracao = diferentes.mean()
+        if fracao > TOLERANCIA_FRACAO:
+            linhas, colunas = np.nonzero(diferentes)
+            escala = 72 / DPI
+            problemas.append(f"{diferentes.sum()} pixels diferentes ({fracao:.3%}) na região "
+                             f"x={colunas.min() * escala:.0f}..{colunas.max() * escala:.0f}, "
+                             f"y={linhas.min() * escala:.0f}..{linhas.max() * escala:.0f} (pt)")
+    if texto != texto_esperado:
+        diff = difflib.unified_diff(texto_esperado.splitlines(), texto.splitlines(), "golden", "atual", lineterm="", n=0)
+        problemas.append("texto diferente:\n      " + "\n      ".join(list(diff)[2:12]))
+    return problemas
+
+
+def conferir_documento(doc, paginas, caso, nome, atualizar):
+    """Confere (ou regrava) as páginas de uma folha; 'paginas' são os índices no documento."""
+    problemas = []
+    for n, indice in enumerate(paginas):
+        caminho_base = os.path.join(PASTA_GOLDEN, caso, f"{nome}_pagina{n + 1}")
+        if atualizar:
+            gravar_golden(caminho_base, doc[indice])
+        else:
+            problemas += [f"{caso}/{nome} página {n + 1}: {p}" for p in comparar_pagina(doc[indice], caminho_base)]
+    return problemas
+
+
+def caminho_individual(caso, excel_path, ano, mes, pasta, atualizar, jobs):
+    """Uma chamada de preencher_pdf por professor."""
+    planilha, dicionario_dados = ler_professores(excel_path, ano, mes)
+    inicio = time.perf_counter()
+    saidas = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for dados in dicionario_dados:
+            saida = os.path.join(pasta, f"{nome_folha(dados)}.pdf")
+            if gerador.preencher_pdf(dados, MODELO, saida, excel_path, planilha, ano, mes):
+                saidas.append((dados, saida))
+    segundos = time.perf_counter() - inicio
+    if atualizar:
+        shutil.rmtree(os.path.join(PASTA_GOLDEN, caso), ignore_errors=True)
+        os.makedirs(os.path.join(PASTA_GOLDEN, caso))
+    problemas = []
+    for dados, saida in saidas:
+        with fitz.open(saida) as doc:
+            problemas += conferir_documento(doc, range(len(doc)), caso, nome_folha(dados), atualizar)
+    return len(saidas), segundos, problemas
+
+
+def caminho_combinado(caso, excel_path, ano, mes, pasta, atualizar, jobs):
+    """Todas as folhas num único PDF (gerar_pdf_combinado); as páginas de cada professor saem dos marcadores."""
+    planilha, dicionario_dados = ler_professores(excel_path, ano, mes)
+    saida = os.path.join(pasta, "combinado.pdf")
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gerados, _ = gerador.gerar_pdf_combinado(dicionario_dados, MODELO, saida, excel_path, planilha, ano=ano, mes=mes)
+    segundos = time.perf_counter() - inicio
+    problemas = []
+    with fitz.open(saida) as doc:
+        inicios = [pagina - 1 for _, _, pagina in doc.get_toc()] + [len(doc)]
+        for dados, primeira, proxima in zip(dicionario_dados, inicios, inicios[1:]):
+            problemas += conferir_documento(doc, range(primeira, proxima), caso, nome_folha(dados), False)
+    return gerados, segundos, problemas
+
+
+def caminho_paralelo(caso, excel_path, ano, mes, pasta, atualizar, jobs):
+    """As folhas individuais geradas pelo pool de processos (gerar_folhas com --jobs)."""
+    planilha, dicionario_dados = ler_professores(excel_path, ano, mes)
+    tarefas = [(dados, os.path.join(pasta, f"paralelo_{nome_folha(dados)}.pdf")) for dados in dicionario_dados]
+    inicio = time.perf_counter()
+    resultados = list(gerador.gerar_folhas(tarefas, MODELO, excel_path, planilha, jobs, ano, mes))
+    segundos = time.perf_counter() - inicio
+    problemas = []
+    for (dados, saida), (sucesso, _) in zip(tarefas, resultados):
+        if not sucesso:
+            problemas.append(f"{caso}/{nome_folha(dados)}: falha na geração")
+            continue
+        with fitz.open(saida) as doc:
+            problemas += conferir_documento(doc, range(len(doc)), caso, nome_folha(dados), False)
+    return sum(ok for ok, _ in resultados), segundos, problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere as folhas geradas contra as imagens de referência (golden/).")
+    parser.add_argument("--atualizar", action="store_true", help="regrava as referências a partir do código atual")
+    parser.add_argument("--jobs", type=int, default=1, help="com N > 1, também confere o caminho paralelo")
+    args = parser.parse_args()
+
+    caminhos = [("individual", caminho_individual)]
+    if not args.atualizar:
+        caminhos.append(("combinado", caminho_combinado))
+        if args.jobs > 1:
+            caminhos.append((f"paralelo ({args.jobs})", caminho_paralelo))
+
+    inicio = time.perf_counter()
+    problemas = []
+    print(f"{'Caso':20s} {'Caminho':14s} {'Folhas':>6s} {'Tempo (s)':>10s} {'ms/folha':>9s}  Resultado")
+    with tempfile.TemporaryDirectory(prefix="golden_") as pasta:
+        for caso, excel_path, ano, mes in montar_corpus(pasta):
+            for nome_caminho, caminho in caminhos:
+                folhas, segundos, erros = caminho(caso, excel_path, ano, mes, pasta, args.atualizar, args.jobs)
+                resultado = "referência gravada" if args.atualizar else ("ok" if not erros else f"{len(erros)} diferença(s)")
+                print(f"{caso:20s} {nome_caminho:14s} {folhas:6d} {segundos:10.3f} "
+                      f"{segundos * 1000 / max(folhas, 1):9.1f}  {resultado}")
+                problemas += [f"[{nome_caminho}] {erro}" for erro in erros]
+
+    for problema in problemas:
+        print(problema)
+    print(f"Tempo total: {time.perf_counter() - inicio:.2f}s")
+    if problemas:
+        print(f"FALHOU: {len(problemas)} diferença(s) em relação às referências.")
+        sys.exit(1)
+    print("Referências atualizadas." if args.atualizar else "Todas as páginas conferem com as referências.")
+
+
+if __name__ == "__main__":
+    main()